@@ -33,7 +33,7 @@ if not all([db_user, db_password, db_host]):
     )
 
 # Construct the database URL
-DATABASE_URL = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+DATABASE_URL = f"postgresql+psycopg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 
 # Set database URL from environment
 config.set_main_option("sqlalchemy.url", DATABASE_URL)
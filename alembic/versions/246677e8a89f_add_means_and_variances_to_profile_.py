@@ -18,6 +18,9 @@ down_revision: Union[str, Sequence[str], None] = 'f44c8b1fa365'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# Rows per backfill batch; simple single-table row rewrites tolerate large pages.
+BATCH_SIZE = 20_000
+
 
 def upgrade():
     """Add means and variances columns, migrate data, drop old parameters column."""
@@ -35,19 +38,75 @@ def upgrade():
     # Get database connection
     connection = op.get_bind()
 
-    # Update existing records: copy parameters to means, set default variances
+    # Session-local helper building the variance object from the key set;
+    # IMMUTABLE SQL so the planner inlines it into the UPDATE, and pg_temp
+    # drops it automatically when the migration session ends.
     connection.execute(text("""
-                            UPDATE profile_priors
-                            SET means     = parameters,
-                                variances = (SELECT jsonb_object_agg(key, 0.01)
-                                             FROM jsonb_each(parameters))
-                            WHERE parameters IS NOT NULL
+                            CREATE FUNCTION pg_temp.variances_from_keys(parameters jsonb, val float)
+                                RETURNS jsonb
+                                LANGUAGE sql IMMUTABLE AS
+                            $$
+                            SELECT jsonb_object_agg(k, to_jsonb(val))
+                            FROM jsonb_object_keys(parameters) AS k
+                            $$
                             """))
 
-    # Step 3: Make new columns non-nullable now that data is migrated
+    # The backfill below is paged by primary key so each batch commits
+    # independently instead of holding one giant transaction (bounds WAL
+    # growth and lock duration on large tables).
+
+    # Transient partial index so the NOT NULL range scans below use an index
+    # scan instead of re-scanning the whole heap per batch. CONCURRENTLY needs
+    # to run outside a transaction, hence inside the autocommit block.
+    with op.get_context().autocommit_block():
+        connection.execute(text(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS tmp_pp_param_notnull "
+            "ON profile_priors (id) WHERE parameters IS NOT NULL"
+        ))
+
+    bounds = connection.execute(text(
+        "SELECT min(id), max(id) FROM profile_priors WHERE parameters IS NOT NULL"
+    )).one()
+    min_id, max_id = bounds
+
+    if min_id is not None:
+        with op.get_context().autocommit_block():
+            # One-shot backfill: don't wait for WAL fsync on every batch
+            # commit, and give the jsonb aggregation room to work in memory.
+            # Session-level SETs (not SET LOCAL) because every batch in the
+            # autocommit block is its own transaction; a crash mid-backfill
+            # just means re-running the migration.
+            connection.execute(text("SET synchronous_commit = OFF"))
+            connection.execute(text("SET work_mem = '256MB'"))
+
+            for lo in range(min_id, max_id + 1, BATCH_SIZE):
+                hi = lo + BATCH_SIZE - 1
+                # Update one id-range: copy parameters to means, seed default
+                # variances from the key set via the inlined helper above.
+                connection.execute(text("""
+                                        UPDATE profile_priors
+                                        SET means     = parameters,
+                                            variances = pg_temp.variances_from_keys(parameters, 0.01)
+                                        WHERE parameters IS NOT NULL
+                                          AND id BETWEEN :lo AND :hi
+                                        """), {"lo": lo, "hi": hi})
+
+            # Back to the server defaults for the remaining DDL.
+            connection.execute(text("RESET synchronous_commit"))
+            connection.execute(text("RESET work_mem"))
+
+    # The transient index has served its purpose once the backfill is done.
+    connection.execute(text("DROP INDEX IF EXISTS tmp_pp_param_notnull"))
+
+    # Step 3: Make new columns non-nullable now that data is migrated.
+    # One combined ALTER TABLE validates both NOT NULL constraints in a
+    # single heap scan instead of two separate alter_column scans.
     print("Making new columns non-nullable...")
-    op.alter_column('profile_priors', 'means', nullable=False)
-    op.alter_column('profile_priors', 'variances', nullable=False)
+    op.execute(
+        "ALTER TABLE profile_priors "
+        "ALTER COLUMN means SET NOT NULL, "
+        "ALTER COLUMN variances SET NOT NULL"
+    )
 
     # Step 4: Drop old parameters column
     print("Dropping old parameters column...")
@@ -0,0 +1,65 @@
+"""store enums as varchar with check
+
+Revision ID: 3e91d20c7a44
+Revises: c8a04f217d5b
+Create Date: 2025-08-29 15:02:18.493827
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '3e91d20c7a44'
+down_revision: Union[str, Sequence[str], None] = 'c8a04f217d5b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Values are the Python enum NAMES — that is what both the native enum
+# columns and SQLAlchemy's non-native Enum store.
+DISCIPLINES = ('ROAD', 'GRAVEL', 'MTB', 'TREKKING', 'COMMUTE')
+STATUSES = ('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED')
+
+# (table, column, type name, allowed values); the CHECK constraint carries
+# the type's name, matching what Enum(create_constraint=True, name=...) emits
+ENUM_COLUMNS = (
+    ('graphhopper_custom_profiles', 'discipline', 'disciplinetype', DISCIPLINES),
+    ('saved_routes', 'discipline', 'disciplinetype', DISCIPLINES),
+    ('precomputed_routes', 'discipline', 'disciplinetype', DISCIPLINES),
+    ('parameter_update_requests', 'status', 'requeststatus', STATUSES),
+)
+
+
+def _value_list(values):
+    return ", ".join(f"'{v}'" for v in values)
+
+
+def upgrade():
+    """Convert native enum columns to VARCHAR(20) + CHECK constraints."""
+    for table, column, type_name, values in ENUM_COLUMNS:
+        op.execute(f"""
+            ALTER TABLE {table}
+                ALTER COLUMN {column} TYPE varchar(20) USING {column}::text
+        """)
+        op.execute(f"""
+            ALTER TABLE {table}
+                ADD CONSTRAINT {type_name}
+                CHECK ({column} IN ({_value_list(values)}))
+        """)
+
+    # No column references them any more
+    op.execute("DROP TYPE disciplinetype")
+    op.execute("DROP TYPE requeststatus")
+
+
+def downgrade():
+    """Restore the native Postgres enum types."""
+    op.execute(f"CREATE TYPE disciplinetype AS ENUM ({_value_list(DISCIPLINES)})")
+    op.execute(f"CREATE TYPE requeststatus AS ENUM ({_value_list(STATUSES)})")
+
+    for table, column, type_name, _values in ENUM_COLUMNS:
+        op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {type_name}")
+        op.execute(f"""
+            ALTER TABLE {table}
+                ALTER COLUMN {column} TYPE {type_name} USING {column}::{type_name}
+        """)
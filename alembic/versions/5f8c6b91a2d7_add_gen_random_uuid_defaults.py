@@ -0,0 +1,36 @@
+"""add gen_random_uuid defaults
+
+Revision ID: 5f8c6b91a2d7
+Revises: 3e91d20c7a44
+Create Date: 2025-08-29 15:14:02.771346
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '5f8c6b91a2d7'
+down_revision: Union[str, Sequence[str], None] = '3e91d20c7a44'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# UUID primary keys now generated inside Postgres (gen_random_uuid() is
+# built in since PG13); the initial schema shipped these columns with no
+# default, so inserts relied on the app sending an id.
+UUID_PK_TABLES = (
+    'user_profiles',
+    'learned_parameters',
+    'parameter_update_requests',
+    'saved_routes',
+)
+
+
+def upgrade():
+    for table in UUID_PK_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id SET DEFAULT gen_random_uuid()")
+
+
+def downgrade():
+    for table in UUID_PK_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id DROP DEFAULT")
@@ -0,0 +1,119 @@
+"""store parameter vectors as float arrays
+
+Revision ID: 7d2f90e81c35
+Revises: 9a1e45c3b8f6
+Create Date: 2025-08-29 15:41:12.904518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+from sqlalchemy import text
+
+# revision identifiers, used by Alembic.
+revision: str = '7d2f90e81c35'
+down_revision: Union[str, Sequence[str], None] = '9a1e45c3b8f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    """Convert JSONB parameter maps to float8[] ordered by the profile's
+    parameter name list."""
+    connection = op.get_bind()
+
+    # The live columns hold a mix of shapes: the original name->value objects
+    # plus bare arrays written after the model switched to ARRAY(Float).
+    # Objects are reordered by the owning profile's parameter list (the
+    # documented array convention); arrays pass through element-wise.
+    connection.execute(text("""
+        CREATE FUNCTION pg_temp.to_param_array(val jsonb, names jsonb)
+            RETURNS float8[]
+            LANGUAGE sql IMMUTABLE AS
+        $$
+        SELECT CASE jsonb_typeof(val)
+            WHEN 'array' THEN
+                (SELECT array_agg(e::float8 ORDER BY ord)
+                 FROM jsonb_array_elements_text(val) WITH ORDINALITY AS a(e, ord))
+            ELSE
+                (SELECT array_agg((val ->> name)::float8 ORDER BY ord)
+                 FROM jsonb_array_elements_text(names) WITH ORDINALITY AS n(name, ord))
+        END
+        $$
+    """))
+
+    # ALTER TYPE ... USING cannot contain subqueries, so convert via
+    # add-column + UPDATE-with-join + drop + rename instead.
+    op.execute("ALTER TABLE profile_priors ADD COLUMN means_arr float8[], "
+               "ADD COLUMN variances_arr float8[]")
+    connection.execute(text("""
+        UPDATE profile_priors pp
+        SET means_arr     = pg_temp.to_param_array(pp.means, gp.parameters),
+            variances_arr = pg_temp.to_param_array(pp.variances, gp.parameters)
+        FROM graphhopper_custom_profiles gp
+        WHERE gp.id = pp.profile_id
+    """))
+    op.execute("ALTER TABLE profile_priors DROP COLUMN means, DROP COLUMN variances")
+    op.execute("ALTER TABLE profile_priors RENAME COLUMN means_arr TO means")
+    op.execute("ALTER TABLE profile_priors RENAME COLUMN variances_arr TO variances")
+    op.execute("ALTER TABLE profile_priors "
+               "ALTER COLUMN means SET NOT NULL, ALTER COLUMN variances SET NOT NULL")
+
+    op.execute("ALTER TABLE learned_parameters ADD COLUMN parameters_arr float8[]")
+    connection.execute(text("""
+        UPDATE learned_parameters lp
+        SET parameters_arr = pg_temp.to_param_array(lp.parameters, gp.parameters)
+        FROM user_profiles up
+        JOIN graphhopper_custom_profiles gp ON gp.id = up.profile_id
+        WHERE up.id = lp.user_profile_id
+    """))
+    op.execute("ALTER TABLE learned_parameters DROP COLUMN parameters")
+    op.execute("ALTER TABLE learned_parameters RENAME COLUMN parameters_arr TO parameters")
+    op.execute("ALTER TABLE learned_parameters ALTER COLUMN parameters SET NOT NULL")
+    # b3d71c9e4f02 set this on the old column; re-adding loses it
+    op.execute("ALTER TABLE learned_parameters "
+               "ALTER COLUMN parameters SET STORAGE EXTERNAL")
+
+
+def downgrade():
+    """Restore the JSONB name->value objects."""
+    connection = op.get_bind()
+
+    connection.execute(text("""
+        CREATE FUNCTION pg_temp.to_param_object(val float8[], names jsonb)
+            RETURNS jsonb
+            LANGUAGE sql IMMUTABLE AS
+        $$
+        SELECT jsonb_object_agg(name, to_jsonb(val[ord]))
+        FROM jsonb_array_elements_text(names) WITH ORDINALITY AS n(name, ord)
+        $$
+    """))
+
+    op.execute("ALTER TABLE profile_priors ADD COLUMN means_obj jsonb, "
+               "ADD COLUMN variances_obj jsonb")
+    connection.execute(text("""
+        UPDATE profile_priors pp
+        SET means_obj     = pg_temp.to_param_object(pp.means, gp.parameters),
+            variances_obj = pg_temp.to_param_object(pp.variances, gp.parameters)
+        FROM graphhopper_custom_profiles gp
+        WHERE gp.id = pp.profile_id
+    """))
+    op.execute("ALTER TABLE profile_priors DROP COLUMN means, DROP COLUMN variances")
+    op.execute("ALTER TABLE profile_priors RENAME COLUMN means_obj TO means")
+    op.execute("ALTER TABLE profile_priors RENAME COLUMN variances_obj TO variances")
+    op.execute("ALTER TABLE profile_priors "
+               "ALTER COLUMN means SET NOT NULL, ALTER COLUMN variances SET NOT NULL")
+
+    op.execute("ALTER TABLE learned_parameters ADD COLUMN parameters_obj jsonb")
+    connection.execute(text("""
+        UPDATE learned_parameters lp
+        SET parameters_obj = pg_temp.to_param_object(lp.parameters, gp.parameters)
+        FROM user_profiles up
+        JOIN graphhopper_custom_profiles gp ON gp.id = up.profile_id
+        WHERE up.id = lp.user_profile_id
+    """))
+    op.execute("ALTER TABLE learned_parameters DROP COLUMN parameters")
+    op.execute("ALTER TABLE learned_parameters RENAME COLUMN parameters_obj TO parameters")
+    op.execute("ALTER TABLE learned_parameters ALTER COLUMN parameters SET NOT NULL")
+    op.execute("ALTER TABLE learned_parameters "
+               "ALTER COLUMN parameters SET STORAGE EXTERNAL")
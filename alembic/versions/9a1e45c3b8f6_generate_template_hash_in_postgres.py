@@ -0,0 +1,41 @@
+"""generate template hash in postgres
+
+Revision ID: 9a1e45c3b8f6
+Revises: 5f8c6b91a2d7
+Create Date: 2025-08-29 15:26:40.118259
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = '9a1e45c3b8f6'
+down_revision: Union[str, Sequence[str], None] = '5f8c6b91a2d7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade():
+    """Swap the app-maintained hex hash for a pgcrypto generated column."""
+    op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+
+    # A column cannot be altered into GENERATED; drop and re-add. Adding a
+    # STORED generated column computes it for every existing row, so rows
+    # the app never hashed (the old column was nullable) get backfilled too.
+    op.execute("ALTER TABLE graphhopper_custom_profiles DROP COLUMN template_hash")
+    op.execute("""
+        ALTER TABLE graphhopper_custom_profiles
+            ADD COLUMN template_hash bytea
+            GENERATED ALWAYS AS (digest(template::text, 'sha256')) STORED
+    """)
+
+
+def downgrade():
+    """Restore the plain hex column, backfilled from the same digest."""
+    op.execute("ALTER TABLE graphhopper_custom_profiles DROP COLUMN template_hash")
+    op.execute("ALTER TABLE graphhopper_custom_profiles ADD COLUMN template_hash varchar(64)")
+    op.execute("""
+        UPDATE graphhopper_custom_profiles
+        SET template_hash = encode(digest(template::text, 'sha256'), 'hex')
+    """)
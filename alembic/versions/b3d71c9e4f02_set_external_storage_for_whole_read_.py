@@ -0,0 +1,39 @@
+"""set external storage for whole read columns
+
+Revision ID: b3d71c9e4f02
+Revises: 246677e8a89f
+Create Date: 2025-08-29 10:12:03.511842
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'b3d71c9e4f02'
+down_revision: Union[str, Sequence[str], None] = '246677e8a89f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# These columns are only ever read whole (never queried by key), so paying
+# pglz compression/decompression on every SELECT buys nothing. EXTERNAL keeps
+# oversized values out-of-line but uncompressed — decisive when the worker
+# reloads thousands of rows for retraining. Applies to newly written values;
+# existing rows keep their storage until rewritten.
+_EXTERNAL_COLUMNS = (
+    ('learned_parameters', 'parameters'),
+    ('learned_parameters', 'convergence_metrics'),
+    ('segment_ratings', 'conditions'),
+)
+
+
+def upgrade():
+    """Switch whole-read TOASTable columns to EXTERNAL storage."""
+    for table, column in _EXTERNAL_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET STORAGE EXTERNAL")
+
+
+def downgrade():
+    """Restore the default EXTENDED (compressed) storage."""
+    for table, column in _EXTERNAL_COLUMNS:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET STORAGE EXTENDED")
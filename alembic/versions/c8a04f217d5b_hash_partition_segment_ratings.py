@@ -0,0 +1,127 @@
+"""hash partition segment ratings
+
+Revision ID: c8a04f217d5b
+Revises: b3d71c9e4f02
+Create Date: 2025-08-29 14:37:55.220716
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'c8a04f217d5b'
+down_revision: Union[str, Sequence[str], None] = 'b3d71c9e4f02'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Eight hash partitions on user_profile_id: retraining reads all of one
+# user's ratings, so each read touches exactly one partition and every
+# per-partition index is ~1/8 of the monolithic btree.
+N_PARTITIONS = 8
+
+
+def upgrade():
+    """Rebuild segment_ratings as a hash-partitioned table."""
+
+    # Partitioning cannot be added in place; rebuild via rename + copy.
+    # Renaming the table does NOT rename its indexes, and index names are
+    # schema-wide, so move them out of the way before recreating them on
+    # the new table (they go down with DROP TABLE at the end).
+    op.execute("ALTER TABLE segment_ratings RENAME TO segment_ratings_old")
+    op.execute("ALTER INDEX segment_ratings_pkey RENAME TO segment_ratings_old_pkey")
+    op.execute("ALTER INDEX unique_user_way_rating RENAME TO unique_user_way_rating_old")
+    op.execute("ALTER INDEX idx_ratings_user_profile RENAME TO idx_ratings_user_profile_old")
+    op.execute("ALTER INDEX idx_ratings_way RENAME TO idx_ratings_way_old")
+
+    # Defined explicitly rather than via LIKE: the rebuild is the one chance
+    # to swap the random-UUID id for a bigint identity (half the PK width,
+    # append-only btree growth), and LIKE would not copy the foreign keys
+    # anyway. The PK must include the partition key; the unique constraint
+    # already does.
+    op.execute("""
+        CREATE TABLE segment_ratings (
+            id BIGINT GENERATED BY DEFAULT AS IDENTITY,
+            user_profile_id UUID NOT NULL,
+            osm_way_id INTEGER NOT NULL,
+            weight DOUBLE PRECISION NOT NULL,
+            notes TEXT,
+            conditions JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ DEFAULT now(),
+            PRIMARY KEY (id, user_profile_id),
+            CONSTRAINT valid_weight_range CHECK (weight > 0 AND weight <= 100),
+            CONSTRAINT unique_user_way_rating UNIQUE (user_profile_id, osm_way_id),
+            CONSTRAINT segment_ratings_user_profile_id_fkey
+                FOREIGN KEY (user_profile_id) REFERENCES user_profiles (id),
+            CONSTRAINT segment_ratings_osm_way_id_fkey
+                FOREIGN KEY (osm_way_id) REFERENCES osm_ways (id)
+        ) PARTITION BY HASH (user_profile_id)
+    """)
+
+    for i in range(N_PARTITIONS):
+        op.execute(f"""
+            CREATE TABLE segment_ratings_p{i}
+                PARTITION OF segment_ratings
+                FOR VALUES WITH (MODULUS {N_PARTITIONS}, REMAINDER {i})
+        """)
+
+    # Indexes on the parent propagate to every partition
+    op.execute("CREATE INDEX idx_ratings_user_profile ON segment_ratings (user_profile_id)")
+    op.execute("CREATE INDEX idx_ratings_way ON segment_ratings (osm_way_id)")
+
+    # STORAGE EXTERNAL (set by b3d71c9e4f02) does not survive the rebuild
+    op.execute("ALTER TABLE segment_ratings ALTER COLUMN conditions SET STORAGE EXTERNAL")
+
+    # Old UUID ids are referenced nowhere else, so let the identity assign
+    # fresh bigints; ORDER BY created_at keeps id order matching insert order.
+    op.execute("""
+        INSERT INTO segment_ratings
+            (user_profile_id, osm_way_id, weight, notes, conditions, created_at, updated_at)
+        SELECT user_profile_id, osm_way_id, weight, notes, conditions, created_at, updated_at
+        FROM segment_ratings_old
+        ORDER BY created_at
+    """)
+    op.execute("DROP TABLE segment_ratings_old")
+
+
+def downgrade():
+    """Collapse the partitions back into a plain UUID-keyed table."""
+    op.execute("ALTER TABLE segment_ratings RENAME TO segment_ratings_parted")
+    op.execute("ALTER INDEX segment_ratings_pkey RENAME TO segment_ratings_parted_pkey")
+    op.execute("ALTER INDEX unique_user_way_rating RENAME TO unique_user_way_rating_parted")
+    op.execute("ALTER INDEX idx_ratings_user_profile RENAME TO idx_ratings_user_profile_parted")
+    op.execute("ALTER INDEX idx_ratings_way RENAME TO idx_ratings_way_parted")
+
+    op.execute("""
+        CREATE TABLE segment_ratings (
+            id UUID NOT NULL PRIMARY KEY,
+            user_profile_id UUID NOT NULL,
+            osm_way_id INTEGER NOT NULL,
+            weight DOUBLE PRECISION NOT NULL,
+            notes TEXT,
+            conditions JSONB,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            updated_at TIMESTAMPTZ DEFAULT now(),
+            CONSTRAINT valid_weight_range CHECK (weight > 0 AND weight <= 100),
+            CONSTRAINT unique_user_way_rating UNIQUE (user_profile_id, osm_way_id),
+            CONSTRAINT segment_ratings_user_profile_id_fkey
+                FOREIGN KEY (user_profile_id) REFERENCES user_profiles (id),
+            CONSTRAINT segment_ratings_osm_way_id_fkey
+                FOREIGN KEY (osm_way_id) REFERENCES osm_ways (id)
+        )
+    """)
+    op.execute("CREATE INDEX idx_ratings_user_profile ON segment_ratings (user_profile_id)")
+    op.execute("CREATE INDEX idx_ratings_way ON segment_ratings (osm_way_id)")
+    op.execute("ALTER TABLE segment_ratings ALTER COLUMN conditions SET STORAGE EXTERNAL")
+
+    # The bigint ids cannot round-trip back to the original UUIDs; mint new ones
+    op.execute("""
+        INSERT INTO segment_ratings
+            (id, user_profile_id, osm_way_id, weight, notes, conditions, created_at, updated_at)
+        SELECT gen_random_uuid(), user_profile_id, osm_way_id, weight, notes, conditions,
+               created_at, updated_at
+        FROM segment_ratings_parted
+        ORDER BY created_at
+    """)
+    op.execute("DROP TABLE segment_ratings_parted")
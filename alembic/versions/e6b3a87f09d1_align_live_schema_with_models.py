@@ -0,0 +1,181 @@
+"""align live schema with models
+
+Revision ID: e6b3a87f09d1
+Revises: 7d2f90e81c35
+Create Date: 2025-08-29 16:05:33.287401
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6b3a87f09d1'
+down_revision: Union[str, Sequence[str], None] = '7d2f90e81c35'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _point_from_jsonb(column: str) -> str:
+    """SQL turning a {"lat": .., "lon": ..} JSONB point into a geography."""
+    return (f"ST_SetSRID(ST_MakePoint(({column} ->> 'lon')::float8, "
+            f"({column} ->> 'lat')::float8), 4326)::geography")
+
+
+def _jsonb_from_point(column: str) -> str:
+    """SQL turning a geography point back into the JSONB shape."""
+    return (f"jsonb_build_object('lat', ST_Y({column}::geometry), "
+            f"'lon', ST_X({column}::geometry))")
+
+
+def upgrade():
+    """Catch the live schema up with everything the models changed:
+    PostGIS geography columns, partial/covering indexes, clock_timestamp
+    defaults, the generated length column and the parameters_cache table."""
+
+    op.execute("CREATE EXTENSION IF NOT EXISTS postgis")
+
+    # --- osm_ways: WKT text -> geography, generated length, drop dup index
+    op.execute("ALTER TABLE osm_ways ADD COLUMN geometry geography(LINESTRING, 4326)")
+    op.execute("UPDATE osm_ways SET geometry = ST_GeogFromText(geometry_wkt)")
+    op.execute("ALTER TABLE osm_ways ALTER COLUMN geometry SET NOT NULL")
+    op.execute("ALTER TABLE osm_ways DROP COLUMN geometry_wkt")
+    # Adding the STORED generated column computes ST_Length (meters on
+    # geography) for every existing row, replacing the app-maintained value
+    op.execute("ALTER TABLE osm_ways DROP COLUMN length_meters")
+    op.execute("""
+        ALTER TABLE osm_ways
+            ADD COLUMN length_meters double precision
+            GENERATED ALWAYS AS (ST_Length(geometry)) STORED
+    """)
+    # Duplicated by the unique constraint's backing index on osm_id
+    op.execute("DROP INDEX idx_osm_way_id")
+
+    # --- saved_routes: WKT/JSONB route data -> geography
+    op.execute("ALTER TABLE saved_routes ADD COLUMN geometry geography(LINESTRING, 4326)")
+    op.execute("UPDATE saved_routes SET geometry = ST_GeogFromText(geometry_wkt)")
+    op.execute("ALTER TABLE saved_routes ALTER COLUMN geometry SET NOT NULL")
+    op.execute("ALTER TABLE saved_routes DROP COLUMN geometry_wkt")
+    for col in ('start_point', 'end_point'):
+        op.execute(f"ALTER TABLE saved_routes RENAME COLUMN {col} TO {col}_json")
+        op.execute(f"ALTER TABLE saved_routes ADD COLUMN {col} geography(POINT, 4326)")
+        op.execute(f"UPDATE saved_routes SET {col} = {_point_from_jsonb(col + '_json')}")
+        op.execute(f"ALTER TABLE saved_routes ALTER COLUMN {col} SET NOT NULL")
+        op.execute(f"ALTER TABLE saved_routes DROP COLUMN {col}_json")
+
+    # --- precomputed_routes: same conversions plus the KNN center point
+    op.execute("ALTER TABLE precomputed_routes ADD COLUMN geometry geography(LINESTRING, 4326)")
+    op.execute("UPDATE precomputed_routes SET geometry = ST_GeogFromText(geometry_wkt)")
+    op.execute("ALTER TABLE precomputed_routes ALTER COLUMN geometry SET NOT NULL")
+    op.execute("ALTER TABLE precomputed_routes DROP COLUMN geometry_wkt")
+    for col in ('start_point', 'end_point'):
+        op.execute(f"ALTER TABLE precomputed_routes RENAME COLUMN {col} TO {col}_json")
+        op.execute(f"ALTER TABLE precomputed_routes ADD COLUMN {col} geography(POINT, 4326)")
+        op.execute(f"UPDATE precomputed_routes SET {col} = {_point_from_jsonb(col + '_json')}")
+        op.execute(f"ALTER TABLE precomputed_routes ALTER COLUMN {col} SET NOT NULL")
+        op.execute(f"ALTER TABLE precomputed_routes DROP COLUMN {col}_json")
+    op.execute("ALTER TABLE precomputed_routes ADD COLUMN center_point geography(POINT, 4326)")
+    op.execute("""
+        UPDATE precomputed_routes
+        SET center_point = ST_SetSRID(ST_MakePoint(center_lon, center_lat), 4326)::geography
+    """)
+    op.execute("ALTER TABLE precomputed_routes ALTER COLUMN center_point SET NOT NULL")
+    op.execute("DROP INDEX idx_precomputed_location")
+    op.execute("ALTER TABLE precomputed_routes DROP COLUMN center_lat, DROP COLUMN center_lon")
+    op.execute("CREATE INDEX idx_precomputed_center ON precomputed_routes USING gist (center_point)")
+
+    # --- partial indexes: only index the rows the hot queries can touch
+    op.execute("DROP INDEX idx_active_profiles")
+    op.execute("""
+        CREATE INDEX idx_active_profiles ON graphhopper_custom_profiles (discipline)
+            WHERE is_active
+    """)
+    op.execute("CREATE INDEX idx_active_priors ON profile_priors (profile_id) WHERE is_active")
+    op.execute("DROP INDEX idx_update_requests_status")
+    op.execute("""
+        CREATE INDEX idx_update_requests_queue ON parameter_update_requests (requested_at)
+            WHERE status IN ('PENDING', 'PROCESSING')
+    """)
+
+    # --- covering index for the retraining read (index-only scan)
+    op.execute("DROP INDEX idx_ratings_user_profile")
+    op.execute("""
+        CREATE INDEX idx_ratings_user_profile ON segment_ratings (user_profile_id)
+            INCLUDE (osm_way_id, weight)
+    """)
+
+    # --- clock_timestamp so batch-inserted rows get distinct timestamps
+    op.execute("ALTER TABLE learned_parameters "
+               "ALTER COLUMN created_at SET DEFAULT clock_timestamp()")
+    op.execute("ALTER TABLE segment_ratings "
+               "ALTER COLUMN created_at SET DEFAULT clock_timestamp()")
+
+    # --- optimization-result cache keyed by (profile, exact rating set)
+    op.execute("""
+        CREATE TABLE parameters_cache (
+            profile_id INTEGER NOT NULL REFERENCES graphhopper_custom_profiles (id),
+            ratings_hash BYTEA NOT NULL,
+            parameters FLOAT8[] NOT NULL,
+            created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+            PRIMARY KEY (profile_id, ratings_hash)
+        )
+    """)
+
+
+def downgrade():
+    op.execute("DROP TABLE parameters_cache")
+
+    op.execute("ALTER TABLE segment_ratings ALTER COLUMN created_at SET DEFAULT now()")
+    op.execute("ALTER TABLE learned_parameters ALTER COLUMN created_at SET DEFAULT now()")
+
+    op.execute("DROP INDEX idx_ratings_user_profile")
+    op.execute("CREATE INDEX idx_ratings_user_profile ON segment_ratings (user_profile_id)")
+
+    op.execute("DROP INDEX idx_update_requests_queue")
+    op.execute("CREATE INDEX idx_update_requests_status ON parameter_update_requests (status)")
+    op.execute("DROP INDEX idx_active_priors")
+    op.execute("DROP INDEX idx_active_profiles")
+    op.execute("""
+        CREATE INDEX idx_active_profiles
+            ON graphhopper_custom_profiles (discipline, is_active)
+    """)
+
+    op.execute("DROP INDEX idx_precomputed_center")
+    op.execute("ALTER TABLE precomputed_routes "
+               "ADD COLUMN center_lat double precision, ADD COLUMN center_lon double precision")
+    op.execute("""
+        UPDATE precomputed_routes
+        SET center_lat = ST_Y(center_point::geometry),
+            center_lon = ST_X(center_point::geometry)
+    """)
+    op.execute("ALTER TABLE precomputed_routes "
+               "ALTER COLUMN center_lat SET NOT NULL, ALTER COLUMN center_lon SET NOT NULL")
+    op.execute("ALTER TABLE precomputed_routes DROP COLUMN center_point")
+    op.execute("""
+        CREATE INDEX idx_precomputed_location
+            ON precomputed_routes (center_lat, center_lon)
+    """)
+
+    for table in ('precomputed_routes', 'saved_routes'):
+        for col in ('start_point', 'end_point'):
+            op.execute(f"ALTER TABLE {table} RENAME COLUMN {col} TO {col}_geog")
+            op.execute(f"ALTER TABLE {table} ADD COLUMN {col} jsonb")
+            op.execute(f"UPDATE {table} SET {col} = {_jsonb_from_point(col + '_geog')}")
+            op.execute(f"ALTER TABLE {table} ALTER COLUMN {col} SET NOT NULL")
+            op.execute(f"ALTER TABLE {table} DROP COLUMN {col}_geog")
+        op.execute(f"ALTER TABLE {table} ADD COLUMN geometry_wkt text")
+        op.execute(f"UPDATE {table} SET geometry_wkt = ST_AsText(geometry)")
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN geometry_wkt SET NOT NULL")
+        op.execute(f"ALTER TABLE {table} DROP COLUMN geometry")
+
+    op.execute("CREATE INDEX idx_osm_way_id ON osm_ways (osm_id)")
+    op.execute("ALTER TABLE osm_ways DROP COLUMN length_meters")
+    op.execute("ALTER TABLE osm_ways ADD COLUMN length_meters double precision")
+    op.execute("UPDATE osm_ways SET length_meters = ST_Length(geometry)")
+    op.execute("ALTER TABLE osm_ways ADD COLUMN geometry_wkt text")
+    op.execute("UPDATE osm_ways SET geometry_wkt = ST_AsText(geometry)")
+    op.execute("ALTER TABLE osm_ways ALTER COLUMN geometry_wkt SET NOT NULL")
+    op.execute("ALTER TABLE osm_ways DROP COLUMN geometry")
+
+    # postgis itself is left installed; nothing depends on it any more but
+    # dropping extensions is not this migration's call
@@ -1,4 +1,7 @@
-from pydantic import BaseModel, Field
+from dataclasses import dataclass
+
+import numpy as np
+from pydantic import BaseModel, Field, field_validator
 from typing import Optional, List, Dict, Any
 
 
@@ -7,6 +10,17 @@ class RoutePoint(BaseModel):
     lon: float = Field(..., ge=-180, le=180)
 
 
+@dataclass(slots=True)
+class SegmentAttributes:
+    """Common detail attributes projected out of a RouteSegment in one go."""
+    surface: Optional[str] = None
+    smoothness: Optional[str] = None
+    track_type: Optional[str] = None
+    average_slope: Optional[float] = None
+    max_speed: Optional[float] = None
+    road_class: Optional[str] = None
+
+
 class RouteSegment(BaseModel):
     """Flexible segment with any detail attributes from GraphHopper"""
     start_index: int
@@ -15,30 +29,23 @@ class RouteSegment(BaseModel):
     end_distance: float  # Distance from start in meters
     attributes: Dict[str, Any]  # Flexible dict for any detail type
 
-    # Helper properties for common attributes
-    @property
-    def surface(self) -> Optional[str]:
-        return self.attributes.get('surface')
-
-    @property
-    def smoothness(self) -> Optional[str]:
-        return self.attributes.get('smoothness')
-
-    @property
-    def track_type(self) -> Optional[str]:
-        return self.attributes.get('track_type')
-
-    @property
-    def average_slope(self) -> Optional[float]:
-        return self.attributes.get('average_slope')
-
-    @property
-    def max_speed(self) -> Optional[float]:
-        return self.attributes.get('max_speed')
-
-    @property
-    def road_class(self) -> Optional[str]:
-        return self.attributes.get('road_class')
+    def to_flat(self) -> SegmentAttributes:
+        """Project the common detail attributes into a slotted dataclass.
+
+        Consumers that read several attributes per segment should call this
+        once and use plain attribute access instead of going through a
+        descriptor + dict.get chain per attribute. Ad-hoc lookups can use
+        ``segment.attributes.get(...)`` directly.
+        """
+        get = self.attributes.get
+        return SegmentAttributes(
+            surface=get('surface'),
+            smoothness=get('smoothness'),
+            track_type=get('track_type'),
+            average_slope=get('average_slope'),
+            max_speed=get('max_speed'),
+            road_class=get('road_class'),
+        )
 
 
 class RouteRequest(BaseModel):
@@ -69,6 +76,16 @@ class RouteGeometry(BaseModel):
     elevation_profile: Optional[List[ElevationPoint]] = None
     coordinate_distances: Optional[List[float]] = None
 
+    @field_validator('coordinates', 'coordinate_distances', mode='before')
+    @classmethod
+    def _from_ndarray(cls, value):
+        # The route pipeline keeps coordinates in one contiguous float64
+        # buffer instead of N small Python lists; materialize plain lists
+        # only here, at the serialization boundary.
+        if isinstance(value, np.ndarray):
+            return value.tolist()
+        return value
+
 
 class RouteResponse(BaseModel):
     geometry: RouteGeometry
@@ -13,18 +13,23 @@ Usage:
 import argparse
 import json
 import re
-import hashlib
 import sys
+from collections import Counter
 from pathlib import Path
-from typing import List, Set
+from typing import List, Set, Tuple
 
 # Add the parent directory to the Python path to import from r2r_backend
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from r2r_backend.db.base import SessionLocal, engine
-from r2r_backend.db.models import Base, GraphHopperCustomProfile, DisciplineType
+from r2r_backend.db.base import SessionLocal
+from r2r_backend.db.models import DisciplineType
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
+from sqlalchemy import text
+
+
+# Matches {parameter_name} where parameter_name starts with letter and contains
+# letters, numbers, underscores (same pattern as operations.py)
+_PARAM_RE = re.compile(r'\{([a-z][a-z0-9_]*)\}')
 
 
 def extract_parameters_from_template(template_content: str) -> List[str]:
@@ -40,44 +45,32 @@ def extract_parameters_from_template(template_content: str) -> List[str]:
     Returns:
         Sorted list of unique parameter names
     """
-    # Use the better regex pattern from operations.py
-    # Matches {parameter_name} where parameter_name starts with letter and contains letters, numbers, underscores
-    pattern = r'\{([a-z][a-z0-9_]*)\}'
-    matches = re.findall(pattern, template_content)
-
-    # Convert to set to remove duplicates, then back to sorted list
-    unique_parameters = set(matches)
+    # Single pass over the matches; the Counter gives duplicates without
+    # rescanning the match list per parameter
+    counts = Counter(_PARAM_RE.findall(template_content))
 
     # Warn about duplicates (like in operations.py)
-    if len(matches) != len(unique_parameters):
-        duplicates = [p for p in unique_parameters if matches.count(p) > 1]
+    duplicates = [param for param, count in counts.items() if count > 1]
+    if duplicates:
         print(f"Info: Found duplicate parameters in template: {duplicates}")
 
-    return sorted(list(unique_parameters))
-
-
-def compute_template_hash(template_content: str) -> str:
-    """
-    Compute SHA256 hash of template content for change detection.
-
-    Args:
-        template_content: The JSON template as a string
+    return sorted(counts)
 
-    Returns:
-        Hexadecimal SHA256 hash string
-    """
-    return hashlib.sha256(template_content.encode('utf-8')).hexdigest()
 
-
-def validate_template_json(template_path: Path) -> str:
+def validate_template_json(template_path: Path) -> Tuple[str, dict]:
     """
     Load and validate the GraphHopper template JSON.
 
+    Reads the file exactly once and returns both the raw content and the
+    parsed dict so the caller doesn't parse the JSON again. The change-
+    detection hash is no longer computed here — template_hash is a generated
+    column that Postgres fills in via pgcrypto.
+
     Args:
         template_path: Path to the JSON template file
 
     Returns:
-        Template content as string
+        Tuple of (template content as string, parsed template dict)
 
     Raises:
         FileNotFoundError: If template file doesn't exist
@@ -90,10 +83,10 @@ def validate_template_json(template_path: Path) -> str:
         with open(template_path, 'r', encoding='utf-8') as f:
             content = f.read()
 
-        # Validate it's proper JSON
-        json.loads(content)
+        # Validate it's proper JSON and keep the parsed result for reuse
+        parsed = json.loads(content)
 
-        return content
+        return content, parsed
     except json.JSONDecodeError as e:
         raise json.JSONDecodeError(f"Invalid JSON in template file: {e}")
 
@@ -118,26 +111,6 @@ def validate_discipline(discipline: str) -> DisciplineType:
         raise ValueError(f"Invalid discipline '{discipline}'. Valid options: {valid_disciplines}")
 
 
-def get_next_version(db_session, discipline: DisciplineType) -> int:
-    """
-    Get the next version number for a discipline.
-
-    Args:
-        db_session: SQLAlchemy session
-        discipline: The discipline type
-
-    Returns:
-        Next version number (1 if no existing profiles)
-    """
-    max_version = db_session.query(
-        func.max(GraphHopperCustomProfile.version)
-    ).filter(
-        GraphHopperCustomProfile.discipline == discipline
-    ).scalar()
-
-    return (max_version or 0) + 1
-
-
 def create_custom_profile(
         discipline: str,
         name: str,
@@ -162,20 +135,13 @@ def create_custom_profile(
     # Validate inputs
     discipline_enum = validate_discipline(discipline)
     template_path_obj = Path(template_path)
-    template_content = validate_template_json(template_path_obj)
+    template_content, template_json = validate_template_json(template_path_obj)
 
-    # Extract parameters and compute hash
+    # Extract parameters
     parameters = extract_parameters_from_template(template_content)
-    template_hash = compute_template_hash(template_content)
 
     print(f"📋 Found {len(parameters)} parameters in template: {parameters}")
 
-    # Parse template as JSON for validation, then convert back to dict for storage
-    try:
-        template_json = json.loads(template_content)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Invalid JSON in template: {e}")
-
     # Validate required GraphHopper fields
     if "priority" not in template_json:
         raise ValueError("GraphHopper template must contain 'priority' field")
@@ -186,38 +152,47 @@ def create_custom_profile(
     db = SessionLocal()
 
     try:
-        # Get next version for this discipline
-        version = get_next_version(db, discipline_enum)
-
-        # Create the profile
-        profile = GraphHopperCustomProfile(
-            discipline=discipline_enum,
-            name=name,
-            description=description,
-            template=template_json,
-            parameters=parameters,
-            version=version,
-            is_active=True,
-            template_hash=template_hash
-        )
-
-        db.add(profile)
+        # Compute the next version inside the INSERT itself: one round-trip
+        # instead of SELECT max(version) + INSERT, and the
+        # unique_discipline_version constraint serializes concurrent creators
+        # instead of both reading the same max.
+        # template_hash is a generated column now, so it's absent from the
+        # column list; discipline is stored as plain text (native_enum=False)
+        profile_id, version = db.execute(
+            text("""
+                INSERT INTO graphhopper_custom_profiles
+                    (discipline, name, description, template, parameters,
+                     version, is_active)
+                SELECT :discipline, :name, :description,
+                       CAST(:template AS jsonb), CAST(:parameters AS jsonb),
+                       COALESCE(MAX(version), 0) + 1, TRUE
+                FROM graphhopper_custom_profiles
+                WHERE discipline = :discipline
+                RETURNING id, version
+            """),
+            {
+                "discipline": discipline_enum.name,
+                "name": name,
+                "description": description,
+                "template": json.dumps(template_json),
+                "parameters": json.dumps(parameters),
+            },
+        ).one()
         db.commit()
 
         print(f"✅ Profile created successfully!")
-        print(f"   ID: {profile.id}")
+        print(f"   ID: {profile_id}")
         print(f"   Discipline: {discipline_enum.value}")
         print(f"   Name: {name}")
         print(f"   Version: {version}")
         print(f"   Parameters: {len(parameters)}")
-        print(f"   Template hash: {template_hash[:12]}...")
 
-        return profile.id
+        return profile_id
 
     except IntegrityError as e:
         db.rollback()
         if "unique_discipline_version" in str(e):
-            raise ValueError(f"A profile for discipline '{discipline}' version {version} already exists")
+            raise ValueError(f"A profile for discipline '{discipline}' was created concurrently, please retry")
         else:
             raise ValueError(f"Database constraint error: {e}")
     except Exception as e:
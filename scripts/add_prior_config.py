@@ -13,8 +13,16 @@ Usage:
 import argparse
 import sys
 import yaml
+
+# libyaml-backed loader/dumper when available (~10-20x faster than the
+# pure-Python implementations); fall back for wheels built without libyaml
+try:
+    from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+except ImportError:
+    from yaml import SafeLoader, SafeDumper
+
 from pathlib import Path
-from typing import Dict, Any
+from typing import Any, Dict, List
 
 # Add the parent directory to the Python path to import from r2r_backend
 sys.path.insert(0, str(Path(__file__).parent.parent))
@@ -22,7 +30,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from r2r_backend.db.base import SessionLocal
 from r2r_backend.db.models import GraphHopperCustomProfile, ProfilePrior
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy import func
+from sqlalchemy import func, text
 
 
 def get_next_prior_version(db_session, profile_id: int) -> int:
@@ -60,10 +68,9 @@ def generate_prior_config(custom_profile_id: int, output_path: str) -> None:
     db = SessionLocal()
 
     try:
-        # Fetch the custom profile
-        profile = db.query(GraphHopperCustomProfile).filter(
-            GraphHopperCustomProfile.id == custom_profile_id
-        ).first()
+        # Fetch the custom profile by primary key: db.get() consults the
+        # identity map first and uses a single-row plan
+        profile = db.get(GraphHopperCustomProfile, custom_profile_id)
 
         if not profile:
             raise ValueError(f"Custom profile with ID {custom_profile_id} not found")
@@ -101,7 +108,7 @@ def generate_prior_config(custom_profile_id: int, output_path: str) -> None:
             f.write(f"# Description: {profile.description or 'No description'}\n")
             f.write(f"# Generated for version: {next_version}\n\n")
 
-            yaml.dump(config, f, default_flow_style=False, sort_keys=False, indent=2)
+            yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False, indent=2)
 
         print(f"✅ Prior configuration template generated!")
         print(f"   Profile: {profile.name} (ID: {custom_profile_id})")
@@ -157,15 +164,19 @@ def validate_prior_config(config: Dict[str, Any]) -> None:
             raise ValueError(f"Parameter '{param_name}' must have a positive value, got: {param_value}")
 
 
-def insert_prior_config(config_path: str) -> int:
+def insert_prior_config(config_path: str) -> List[int]:
     """
     Insert priors from a YAML configuration file.
 
+    The file may contain a single prior configuration or a list of them.
+    Multi-config files are inserted with one multi-row INSERT instead of a
+    per-row add/commit cycle.
+
     Args:
         config_path: Path to the YAML configuration file
 
     Returns:
-        ID of the created ProfilePrior record
+        IDs of the created ProfilePrior records
 
     Raises:
         FileNotFoundError: If config file doesn't exist
@@ -179,87 +190,58 @@ def insert_prior_config(config_path: str) -> int:
     # Load and validate YAML
     try:
         with open(config_path_obj, 'r', encoding='utf-8') as f:
-            config = yaml.safe_load(f)
+            loaded = yaml.load(f, Loader=SafeLoader)
     except yaml.YAMLError as e:
         raise yaml.YAMLError(f"Invalid YAML format in {config_path}: {e}")
 
-    if not config:
+    if not loaded:
         raise ValueError("Configuration file is empty or contains no data")
 
+    configs = loaded if isinstance(loaded, list) else [loaded]
+
     # Validate configuration structure
-    validate_prior_config(config)
+    for config in configs:
+        validate_prior_config(config)
 
     db = SessionLocal()
 
     try:
-        # Validate custom profile exists
-        profile = db.query(GraphHopperCustomProfile).filter(
-            GraphHopperCustomProfile.id == config['custom_profile_id']
-        ).first()
-
-        if not profile:
-            raise ValueError(f"Custom profile with ID {config['custom_profile_id']} not found")
-
-        # Validate parameters match profile
-        profile_params = set(profile.parameters) if profile.parameters else set()
-        config_params = set(config['parameters'].keys())
-
-        if profile_params != config_params:
-            missing_params = profile_params - config_params
-            extra_params = config_params - profile_params
-
-            error_parts = []
-            if missing_params:
-                error_parts.append(f"Missing parameters: {sorted(missing_params)}")
-            if extra_params:
-                error_parts.append(f"Extra parameters: {sorted(extra_params)}")
-
-            profile_info = f"Profile '{profile.name}' expects: {sorted(profile_params)}"
-            raise ValueError(f"{'. '.join(error_parts)}. {profile_info}")
-
-        # Check if this version already exists
-        existing_prior = db.query(ProfilePrior).filter(
-            ProfilePrior.profile_id == config['custom_profile_id'],
-            ProfilePrior.version == config['version']
-        ).first()
-
-        if existing_prior:
-            raise ValueError(
-                f"Prior version {config['version']} already exists for profile {config['custom_profile_id']}. "
-                f"Use a different version number or delete the existing prior first."
-            )
-
-        # Create the ProfilePrior record
-        prior = ProfilePrior(
-            profile_id=config['custom_profile_id'],
-            parameters=config['parameters'],
-            training_metadata=config.get('training_metadata', {}),
-            version=config['version'],
-            is_active=True  # New priors are active by default
+        rows = []
+        for config in configs:
+            rows.append(_validate_against_profile(db, config))
+
+        # Single multi-row INSERT ... VALUES (...),(...) instead of per-row
+        # add/commit; the single-config case stays on the same path.
+        # sort_by_parameter_order keeps the RETURNING ids aligned with the
+        # input rows so the zip with configs below can't mispair them.
+        result = db.execute(
+            ProfilePrior.__table__.insert().returning(
+                ProfilePrior.id, sort_by_parameter_order=True
+            ),
+            rows
         )
-
-        db.add(prior)
+        created_ids = [row[0] for row in result]
         db.commit()
 
-        print(f"✅ Prior configuration inserted successfully!")
-        print(f"   Prior ID: {prior.id}")
-        print(f"   Profile: {profile.name} (ID: {config['custom_profile_id']})")
-        print(f"   Version: {config['version']}")
-        print(f"   Parameters: {len(config['parameters'])}")
+        print(f"✅ Prior configuration{'s' if len(configs) > 1 else ''} inserted successfully!")
+        for prior_id, config in zip(created_ids, configs):
+            print(f"   Prior ID: {prior_id}")
+            print(f"   Profile ID: {config['custom_profile_id']}")
+            print(f"   Version: {config['version']}")
+            print(f"   Parameters: {len(config['parameters'])}")
 
-        # Show parameter summary
-        print(f"   Parameter values:")
-        for param_name in sorted(config['parameters'].keys()):
-            param_value = config['parameters'][param_name]
-            print(f"     {param_name}: {param_value}")
+            # Show parameter summary
+            print(f"   Parameter values:")
+            for param_name in sorted(config['parameters'].keys()):
+                param_value = config['parameters'][param_name]
+                print(f"     {param_name}: {param_value}")
 
-        return prior.id
+        return created_ids
 
     except IntegrityError as e:
         db.rollback()
         if "unique_profile_prior_version" in str(e):
-            raise ValueError(
-                f"Prior version {config['version']} already exists for profile {config['custom_profile_id']}")
+            raise ValueError("A prior version in this configuration already exists for its profile")
         else:
             raise ValueError(f"Database constraint error: {e}")
     except Exception as e:
@@ -269,6 +251,77 @@ def insert_prior_config(config_path: str) -> int:
         db.close()
 
 
+def _validate_against_profile(db, config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Validate one prior configuration against its profile in the database.
+
+    Args:
+        db: SQLAlchemy session
+        config: Parsed and structurally validated configuration
+
+    Returns:
+        Row mapping suitable for a ProfilePrior insert
+
+    Raises:
+        ValueError: If the profile is missing, parameters mismatch, or the
+            version already exists
+    """
+    # Validate the profile exists and that its parameters match the config.
+    # The set diff runs in Postgres (hash-based EXCEPT) so only the
+    # missing/extra keys come back over the wire, not the full parameter list.
+    row = db.execute(
+        text("""
+            SELECT name,
+                   array(SELECT jsonb_array_elements_text(parameters)
+                         EXCEPT SELECT unnest(CAST(:cfg AS text[]))) AS missing,
+                   array(SELECT unnest(CAST(:cfg AS text[]))
+                         EXCEPT SELECT jsonb_array_elements_text(parameters)) AS extra
+            FROM graphhopper_custom_profiles
+            WHERE id = :pid
+        """),
+        {"cfg": sorted(config['parameters'].keys()), "pid": config['custom_profile_id']},
+    ).first()
+
+    if not row:
+        raise ValueError(f"Custom profile with ID {config['custom_profile_id']} not found")
+
+    profile_name, missing_params, extra_params = row
+
+    if missing_params or extra_params:
+        error_parts = []
+        if missing_params:
+            error_parts.append(f"Missing parameters: {sorted(missing_params)}")
+        if extra_params:
+            error_parts.append(f"Extra parameters: {sorted(extra_params)}")
+
+        profile_info = f"Profile '{profile_name}' does not match the configured parameters"
+        raise ValueError(f"{'. '.join(error_parts)}. {profile_info}")
+
+    # Check if this version already exists
+    existing_prior = db.query(ProfilePrior).filter(
+        ProfilePrior.profile_id == config['custom_profile_id'],
+        ProfilePrior.version == config['version']
+    ).first()
+
+    if existing_prior:
+        raise ValueError(
+            f"Prior version {config['version']} already exists for profile {config['custom_profile_id']}. "
+            f"Use a different version number or delete the existing prior first."
+        )
+
+    # means/variances are stored as bare float arrays ordered by the sorted
+    # parameter names (the order the profile's parameter list uses)
+    ordered_names = sorted(config['parameters'])
+    return {
+        'profile_id': config['custom_profile_id'],
+        'means': [float(config['parameters'][name]) for name in ordered_names],
+        'variances': [0.01] * len(ordered_names),
+        'training_metadata': config.get('training_metadata', {}),
+        'version': config['version'],
+        'is_active': True  # New priors are active by default
+    }
+
+
 def main():
     """Main CLI entry point."""
     parser = argparse.ArgumentParser(
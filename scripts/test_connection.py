@@ -16,4 +16,7 @@ try:
         print(f"  - {table}")
 
 except Exception as e:
-    print(f"❌ Error: {e}")
\ No newline at end of file
+    print(f"❌ Error: {e}")
+finally:
+    # Return pooled sockets promptly — this is a one-shot script
+    engine.dispose()
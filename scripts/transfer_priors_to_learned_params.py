@@ -19,8 +19,9 @@ Usage:
 """
 
 import argparse
+import logging
+import re
 import sys
-import uuid
 from pathlib import Path
 from typing import List
 
@@ -34,7 +35,19 @@ from r2r_backend.db.models import (
     UserProfile,
     LearnedParameters
 )
+from sqlalchemy import insert
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+logger = logging.getLogger(__name__)
+
+
+# Canonical 8-4-4-4-12 hex form; matching this is cheaper than building a
+# uuid.UUID object just to throw it away.
+_UUID_RE = re.compile(
+    r"^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}"
+    r"-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}\Z"
+)
 
 
 def validate_uuid(uuid_string: str) -> str:
@@ -50,51 +63,37 @@ def validate_uuid(uuid_string: str) -> str:
     Raises:
         ValueError: If the string is not a valid UUID
     """
-    try:
-        # This will raise ValueError if not a valid UUID
-        uuid.UUID(uuid_string)
+    if _UUID_RE.match(uuid_string):
         return uuid_string
-    except ValueError:
-        raise ValueError(f"Invalid UUID format: {uuid_string}")
+    raise ValueError(f"Invalid UUID format: {uuid_string}")
 
 
-def get_or_create_user_profile(db_session, user_id: str, profile_id: int) -> UserProfile:
+def get_or_create_user_profile(db_session, user_id: str,
+                               custom_profile: GraphHopperCustomProfile,
+                               profiles_by_id: dict) -> UserProfile:
     """
-    Get existing user profile or create a new one.
+    Get existing user profile (from the prefetched map) or create a new one.
 
     Args:
         db_session: SQLAlchemy session
         user_id: UUID string of the user
-        profile_id: ID of the custom profile
+        custom_profile: The custom profile (already loaded via the prior)
+        profiles_by_id: Prefetched {profile_id: UserProfile} map for this user;
+            newly created profiles are added to it
 
     Returns:
         UserProfile instance (existing or newly created)
-
-    Raises:
-        ValueError: If custom profile doesn't exist
     """
-    # First check if custom profile exists
-    custom_profile = db_session.query(GraphHopperCustomProfile).filter(
-        GraphHopperCustomProfile.id == profile_id
-    ).first()
-
-    if not custom_profile:
-        raise ValueError(f"Custom profile with ID {profile_id} not found")
-
-    # Check if user profile already exists
-    user_profile = db_session.query(UserProfile).filter(
-        UserProfile.user_id == user_id,
-        UserProfile.profile_id == profile_id
-    ).first()
+    user_profile = profiles_by_id.get(custom_profile.id)
 
     if user_profile:
-        print(f"   Using existing user profile (ID: {user_profile.id})")
+        logger.debug("Using existing user profile (ID: %s)", user_profile.id)
         return user_profile
 
     # Create new user profile
     user_profile = UserProfile(
         user_id=user_id,
-        profile_id=profile_id,
+        profile_id=custom_profile.id,
         custom_name=f"Profile for {custom_profile.name}",
         total_ratings=0
     )
@@ -102,7 +101,9 @@ def get_or_create_user_profile(db_session, user_id: str, profile_id: int) -> Use
     db_session.add(user_profile)
     db_session.flush()  # Get the ID without committing
 
-    print(f"   Created new user profile (ID: {user_profile.id})")
+    profiles_by_id[custom_profile.id] = user_profile
+
+    logger.debug("Created new user profile (ID: %s)", user_profile.id)
     return user_profile
 
 
@@ -129,82 +130,120 @@ def transfer_prior_to_learned_params(
     if not prior_ids:
         raise ValueError("At least one prior_id must be specified")
 
-    db = SessionLocal()
-    created_learned_params = []
-
+    # One atomic transaction for the whole run: a single BEGIN/COMMIT pair,
+    # automatic rollback on any exception, and row locks held for exactly as
+    # long as the work needs them.
     try:
-        for prior_id in prior_ids:
-            print(f"\\n🔄 Processing prior ID {prior_id}...")
+        with SessionLocal() as db, db.begin():
+            created_learned_params = _transfer_priors(db, user_id, prior_ids)
+    except IntegrityError as e:
+        if "unique_user_profile" in str(e):
+            raise ValueError("User profile constraint violation - this shouldn't happen!")
+        else:
+            raise ValueError(f"Database constraint error: {e}")
 
-            # Fetch the prior
-            prior = db.query(ProfilePrior).filter(
-                ProfilePrior.id == prior_id
-            ).first()
+    logger.info("Successfully transferred %d priors to learned parameters",
+                len(created_learned_params))
+    return created_learned_params
 
-            if not prior:
-                print(f"   ❌ Prior with ID {prior_id} not found, skipping")
-                continue
 
-            # Get or create user profile
-            user_profile = get_or_create_user_profile(
-                db, user_id, prior.profile_id
-            )
+def _transfer_priors(db, user_id: str, prior_ids: List[int]) -> List[str]:
+    """Do the actual transfer work inside the caller's open transaction."""
+    created_learned_params = []
 
-            # Check if this user already has learned parameters marked as prior
-            existing_learned_prior = db.query(LearnedParameters).filter(
-                LearnedParameters.user_profile_id == user_profile.id,
-                LearnedParameters.is_prior == True
-            ).first()
-
-            if existing_learned_prior:
-                print(f"   ⚠️  User profile already has prior learned parameters (ID: {existing_learned_prior.id})")
-                print(f"      Skipping to avoid duplicates")
-                continue
-
-            # Create learned parameters from prior means
-            learned_params = LearnedParameters(
-                user_profile_id=user_profile.id,
-                parameters=prior.means,  # Transfer the means
-                is_prior=True,
-                rating_count_at_generation=0,
-                convergence_metrics={
-                    "source": "profile_prior",
-                    "prior_id": prior_id,
-                    "prior_version": prior.version,
-                    "transferred_at": "auto_transfer"
-                }
+    # Bulk-fetch everything the loop needs up front (constant number of
+    # queries instead of ~4 per prior): the priors with their profiles,
+    # this user's existing profiles, and existing prior-learned params.
+    priors_by_id = {
+        prior.id: prior
+        for prior in db.query(ProfilePrior).options(
+            joinedload(ProfilePrior.profile)
+        ).filter(ProfilePrior.id.in_(prior_ids))
+    }
+
+    profiles_by_id = {
+        up.profile_id: up
+        for up in db.query(UserProfile).filter(
+            UserProfile.user_id == user_id,
+            UserProfile.profile_id.in_(
+                {p.profile_id for p in priors_by_id.values()}
             )
+        )
+    }
+
+    existing_prior_params = {
+        lp.user_profile_id: lp
+        for lp in db.query(LearnedParameters).filter(
+            LearnedParameters.user_profile_id.in_(
+                [up.id for up in profiles_by_id.values()]
+            ),
+            LearnedParameters.is_prior == True
+        )
+    }
 
-            db.add(learned_params)
-            db.flush()  # Get the ID
+    queued_profile_ids = set()
+    new_rows = []
 
-            created_learned_params.append(str(learned_params.id))
+    for prior_id in prior_ids:
+        prior = priors_by_id.get(prior_id)
 
-            print(f"   ✅ Created learned parameters (ID: {learned_params.id})")
-            print(f"      Parameters: {list(prior.means.keys())}")
-            print(f"      Values: {prior.means}")
+        if not prior:
+            logger.warning("Prior with ID %s not found, skipping", prior_id)
+            continue
 
-        # Commit all changes
-        db.commit()
+        # Get or create user profile
+        user_profile = get_or_create_user_profile(
+            db, user_id, prior.profile, profiles_by_id
+        )
 
-        print(f"\\n🎉 Successfully transferred {len(created_learned_params)} priors to learned parameters")
-        return created_learned_params
+        # Check if this user already has learned parameters marked as prior
+        # (either in the database or queued earlier in this run)
+        existing_learned_prior = existing_prior_params.get(user_profile.id)
 
-    except IntegrityError as e:
-        db.rollback()
-        if "unique_user_profile" in str(e):
-            raise ValueError("User profile constraint violation - this shouldn't happen!")
-        else:
-            raise ValueError(f"Database constraint error: {e}")
-    except Exception as e:
-        db.rollback()
-        raise e
-    finally:
-        db.close()
+        if existing_learned_prior or user_profile.id in queued_profile_ids:
+            existing_id = existing_learned_prior.id if existing_learned_prior else "pending insert"
+            logger.debug(
+                "User profile already has prior learned parameters (ID: %s), "
+                "skipping to avoid duplicates", existing_id
+            )
+            continue
+
+        # Row mapping for the bulk INSERT below (Core executemany)
+        new_rows.append({
+            "user_profile_id": user_profile.id,
+            "parameters": prior.means,  # Transfer the means
+            "is_prior": True,
+            "rating_count_at_generation": 0,
+            "convergence_metrics": {
+                "source": "profile_prior",
+                "prior_id": prior_id,
+                "prior_version": prior.version,
+                "transferred_at": "auto_transfer"
+            }
+        })
+        queued_profile_ids.add(user_profile.id)
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Prior %s values: %s", prior_id, prior.means)
+
+    # One multi-row INSERT ... RETURNING via Core instead of per-row ORM
+    # statements; the enclosing transaction commits once on exit
+    if new_rows:
+        new_ids = db.execute(
+            insert(LearnedParameters).returning(LearnedParameters.id),
+            new_rows
+        ).scalars().all()
+
+        created_learned_params.extend(str(learned_id) for learned_id in new_ids)
+        logger.debug("Created learned parameter IDs: %s", created_learned_params)
+
+    return created_learned_params
 
 
 def main():
     """Main CLI entry point."""
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     parser = argparse.ArgumentParser(
         description="Transfer prior means to learned_parameters table for specific user profiles",
         formatter_class=argparse.RawDescriptionHelpFormatter,
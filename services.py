@@ -1,10 +1,14 @@
 # File: services.py
-import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import copy
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
 from typing import Optional, Dict, Any, Tuple, List
-import requests
-import json
-import math
+import httpx
+import orjson
+
+import numpy as np
 
 from r2r_bo.graphhopper.config import GraphHopperConfig
 from r2r_bo.graphhopper.custom_profile_generator import generate_profile
@@ -12,68 +16,182 @@ from r2r_bo.database.base import session_scope
 
 from models import RouteResponse, RouteGeometry, RouteMetrics, ElevationPoint, RouteSegment
 
-# Global thread pool
-thread_pool = ThreadPoolExecutor(max_workers=10)
+logger = logging.getLogger(__name__)
+
+# pysimdjson parses the large route responses with SIMD (multi-GB/s) when
+# installed; orjson — already a hard dependency — is the fallback. A single
+# parser instance reuses its internal buffer across requests.
+try:
+    import simdjson
+
+    _simdjson_parser = simdjson.Parser()
+
+    def _loads(content: bytes) -> Any:
+        return _simdjson_parser.parse(content, recursive=True)
+except ImportError:
+    _loads = orjson.loads
+
+# Shared async HTTP client to GraphHopper: keep-alive + pooled connections,
+# awaited directly on the event loop so in-flight routes are bounded by the
+# connection pool rather than a worker-thread count.
+_client = httpx.AsyncClient(
+    limits=httpx.Limits(max_connections=100, max_keepalive_connections=50)
+)
+
+
+# Process-local LRU for generated custom models, keyed by the profile id plus
+# a stable hash of the parameter payload (works for nested values too, unlike
+# a tuple-of-items key). Guarded by a lock since requests run on a thread pool.
+_CUSTOM_MODEL_CACHE_SIZE = 1024
+_custom_model_cache: "OrderedDict[Tuple[int, bytes], Dict[str, Any]]" = OrderedDict()
+_custom_model_lock = threading.Lock()
+
+
+def _custom_model_key(custom_profile_id: int, parameters: Dict[str, Any]) -> Tuple[int, bytes]:
+    """Stable cache key: profile id + blake2b of the key-sorted parameters."""
+    digest = hashlib.blake2b(
+        orjson.dumps(parameters, option=orjson.OPT_SORT_KEYS),
+        digest_size=16,
+    ).digest()
+    return custom_profile_id, digest
 
 
 def get_custom_model(custom_profile_id: int, parameters: Dict[str, Any]) -> Dict[str, Any]:
-    """Generate custom model from database."""
-    with session_scope() as session:
-        return generate_profile(custom_profile_id, parameters, session)
+    """Generate custom model from database.
 
+    Repeated requests with identical (profile_id, parameters) skip the DB
+    round-trip and profile generation via the process-local LRU above.
+    Callers get a deep copy so nobody can mutate the cached model in place.
+    """
+    key = _custom_model_key(custom_profile_id, parameters)
+
+    with _custom_model_lock:
+        model = _custom_model_cache.get(key)
+        if model is not None:
+            _custom_model_cache.move_to_end(key)
+
+    if model is None:
+        with session_scope() as session:
+            model = generate_profile(custom_profile_id, parameters, session)
+
+        with _custom_model_lock:
+            _custom_model_cache[key] = model
+            _custom_model_cache.move_to_end(key)
+            while len(_custom_model_cache) > _CUSTOM_MODEL_CACHE_SIZE:
+                _custom_model_cache.popitem(last=False)
+
+    return copy.deepcopy(model)
+
+
+EARTH_RADIUS_M = 6371000  # Earth's radius in meters
+
+# Optional numba kernel: one fused loop over the coordinate buffer with a
+# register-resident accumulator, instead of the ~4 O(N) temporaries the NumPy
+# expression allocates. Not a required dependency — the NumPy path below is
+# the fallback.
+try:
+    import math
+
+    import numba
+
+    @numba.njit(fastmath=True, cache=True)
+    def _haversine_cum(coords: np.ndarray) -> np.ndarray:
+        n = coords.shape[0]
+        out = np.zeros(n)
+        deg2rad = math.pi / 180.0
+        lon_prev = coords[0, 0] * deg2rad
+        lat_prev = coords[0, 1] * deg2rad
+        acc = 0.0
+        for i in range(1, n):
+            lon = coords[i, 0] * deg2rad
+            lat = coords[i, 1] * deg2rad
+            a = (
+                math.sin((lat - lat_prev) / 2) ** 2
+                + math.cos(lat_prev) * math.cos(lat) * math.sin((lon - lon_prev) / 2) ** 2
+            )
+            acc += 2.0 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+            out[i] = acc
+            lon_prev = lon
+            lat_prev = lat
+        return out
 
-def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
-    """Calculate distance between two points in meters using Haversine formula."""
-    R = 6371000  # Earth's radius in meters
+    # Warm the JIT at import so the first request doesn't pay compilation
+    _haversine_cum(np.zeros((2, 2)))
+except ImportError:
+    _haversine_cum = None
 
-    lat1_rad = math.radians(lat1)
-    lat2_rad = math.radians(lat2)
-    delta_lat = math.radians(lat2 - lat1)
-    delta_lon = math.radians(lon2 - lon1)
 
-    a = (math.sin(delta_lat / 2) ** 2 +
-         math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(delta_lon / 2) ** 2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+def calculate_cumulative_distances(coordinates) -> np.ndarray:
+    """Calculate cumulative distance for each coordinate point.
 
-    return R * c
+    Vectorized Haversine over the whole (N, 2) [lon, lat] array: one pass of
+    NumPy ufuncs plus a cumsum instead of per-point Python trigonometry
+    (or a single fused numba loop when numba is installed).
+    """
+    coords = np.asarray(coordinates, dtype=np.float64)
+    if len(coords) < 2:
+        return np.zeros(len(coords))
 
+    if _haversine_cum is not None:
+        return _haversine_cum(coords[:, :2])
 
-def calculate_cumulative_distances(coordinates: List[List[float]]) -> List[float]:
-    """Calculate cumulative distance for each coordinate point."""
-    distances = [0.0]
-    for i in range(1, len(coordinates)):
-        dist = haversine_distance(
-            coordinates[i - 1][1], coordinates[i - 1][0],  # lat, lon
-            coordinates[i][1], coordinates[i][0]
-        )
-        distances.append(distances[-1] + dist)
-    return distances
+    lon = np.radians(coords[:, 0])
+    lat = np.radians(coords[:, 1])
+    dlon = np.diff(lon)
+    dlat = np.diff(lat)
+
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat[:-1]) * np.cos(lat[1:]) * np.sin(dlon / 2) ** 2
+    segment_dists = 2 * EARTH_RADIUS_M * np.arcsin(np.sqrt(a))
+
+    return np.concatenate(([0.0], np.cumsum(segment_dists)))
 
 
 def create_elevation_profile_from_coordinates(
-    coordinates: List[List[float]],
-    coordinate_distances: List[float]
+    coordinates,
+    coordinate_distances
 ) -> List[ElevationPoint]:
     """
     Create elevation profile from coordinates with elevation data.
-    Coordinates format: [lon, lat, elevation]
-    Now includes coordinate_index for mapping back to route coordinates.
+    Coordinates format: (N, 3) array of [lon, lat, elevation] rows ((N, 2)
+    input gets zero elevations).
+    Includes coordinate_index for mapping back to route coordinates.
     """
-    if len(coordinates) < 2:
+    coords = np.asarray(coordinates, dtype=np.float64)
+    if len(coords) < 2:
         return []
 
-    elevation_points = []
+    if coords.shape[1] > 2:
+        elevations = coords[:, 2]
+    else:
+        elevations = np.zeros(len(coords))
 
-    for i, coord in enumerate(coordinates):
-        lon, lat, elevation = coord[0], coord[1], coord[2] if len(coord) > 2 else 0.0
+    # Pull both columns out as plain-float lists once, then build all points
+    # in a single comprehension; model_construct skips per-field validation
+    # for this internally produced data
+    distances = np.asarray(coordinate_distances, dtype=np.float64).tolist()
 
-        elevation_points.append(ElevationPoint(
-            distance=coordinate_distances[i],
-            elevation=elevation,
-            coordinate_index=i  # NEW: Direct mapping to coordinate array
-        ))
+    return [
+        ElevationPoint.model_construct(distance=d, elevation=e, coordinate_index=i)
+        for i, (d, e) in enumerate(zip(distances, elevations.tolist()))
+    ]
 
-    return elevation_points
+
+def _clamp_and_sort_details(
+        details_data: Optional[Dict[str, List]],
+        last: int
+) -> Dict[str, List[Tuple[int, int, Any]]]:
+    """Clamp every detail interval to [0, last] and sort by start index.
+
+    Done exactly once per detail list so the per-segment sweep in
+    merge_detail_segments never re-clamps a row.
+    """
+    clamped: Dict[str, List[Tuple[int, int, Any]]] = {}
+    for dtype, detail_list in (details_data or {}).items():
+        rows = [(max(0, min(a, last)), max(0, min(b, last)), v)
+                for a, b, v in (detail_list or [])]
+        rows.sort(key=lambda row: row[0])
+        clamped[dtype] = rows
+    return clamped
 
 
 def merge_detail_segments(
@@ -87,110 +205,138 @@ def merge_detail_segments(
     GraphHopper returns details as [start_idx, end_idx, value] with 'end_idx' being
     EXCLUSIVE. Different detail types (surface, smoothness, etc.) usually break at
     different indices. We therefore:
-      1) Collect all unique cut points from EVERY detail list (all starts & ends),
-      2) Create atomic segments between consecutive cut points,
-      3) For each atomic segment, assign each detail attribute by coverage:
-         a detail (a,b,val) covers [s,e) if s >= a and e <= b.
+      1) Clamp and sort every detail list once,
+      2) Collect all unique cut points from EVERY detail list (all starts & ends)
+         and create atomic segments between consecutive cut points,
+      3) Sweep the atomic segments and the sorted detail intervals together,
+         advancing one cursor per detail type: a detail (a,b,val) covers [s,e)
+         if s >= a and e <= b, and by construction of the cut set every atomic
+         segment is fully nested inside at most one interval per type.
       4) For any missing attribute, set 'unknown'.
 
-    This guarantees that the sum of per-attribute lengths equals the total route length.
+    This guarantees that the sum of per-attribute lengths equals the total route
+    length, in a single linear pass instead of rescanning every detail interval
+    for every atomic segment.
     """
     n_coords = len(coordinates)
     if n_coords < 2:
         return []
 
-    # --- 1) Collect all unique boundary indices ("cuts") ---
-    # Always include the very first and the very last usable index.
+    # --- 1) Clamp (guard against bad data) and sort each detail list once ---
     # We treat GraphHopper 'end' as exclusive, but clamp to n_coords-1 for distances.
-    cuts = {0, n_coords - 1}
+    last = n_coords - 1
+    clamped = _clamp_and_sort_details(details_data, last)
 
-    for detail_list in (details_data or {}).values():
-        if not detail_list:
-            continue
-        for a, b, _ in detail_list:
-            # Clamp to bounds; guard against bad data
-            a = max(0, min(a, n_coords - 1))
-            b = max(0, min(b, n_coords - 1))
-            cuts.add(a)
-            cuts.add(b)
+    # --- 2) Collect all unique boundary indices ("cuts") ---
+    # Always include the very first and the very last usable index.
+    # Dedup + sort run in NumPy over the clamped start/end arrays; tolist()
+    # hands back plain Python ints for the sweep below.
+    bounds = [np.array([0, last], dtype=np.int64)]
+    for rows in clamped.values():
+        if rows:
+            bounds.append(np.array([row[:2] for row in rows], dtype=np.int64).ravel())
 
-    sorted_cuts = sorted(cuts)
+    sorted_cuts = np.unique(np.concatenate(bounds)).tolist()
 
     # Ensure we have at least two distinct cuts
     if len(sorted_cuts) < 2:
         return []
 
-    # --- 2) Create atomic, non-overlapping segments ---
-    raw_segments: List[Tuple[int, int]] = []
+    # --- 3) Sweep atomic segments and detail intervals together ---
+    # Plain dicts inside the hot loop; Pydantic objects are only materialized
+    # once at the end (model_construct skips validation for this trusted,
+    # internally produced data).
+    raw_segments: List[Dict[str, Any]] = []
+    cursors = dict.fromkeys(clamped, 0)
+
     for i in range(len(sorted_cuts) - 1):
         s = sorted_cuts[i]
         e = sorted_cuts[i + 1]
-        if s < e:
-            raw_segments.append((s, e))
-
-    if not raw_segments:
-        return []
-
-    # --- 3) For each atomic segment, assign attribute values by coverage ---
-    segments: List[RouteSegment] = []
-
-    # Helper to get the value of a detail type for [s, e)
-    def value_for_segment(detail_list: List[List[Any]], s: int, e: int) -> str:
-        """
-        Return the value whose [a,b) interval fully covers [s,e).
-        If none covers the range, return 'unknown'.
-        """
-        if not detail_list:
-            return "unknown"
-
-        for a, b, v in detail_list:
-            # Clamp to bounds in case original data is off
-            a = max(0, min(a, n_coords - 1))
-            b = max(0, min(b, n_coords - 1))
-            # GraphHopper details are [a, b) (end exclusive). Our atomic segment is [s, e).
-            if s >= a and e <= b:
-                return v if v not in (None, "", "missing", "null", "undefined") else "unknown"
-        return "unknown"
-
-    for s, e in raw_segments:
-        # Distances are indexed by coordinate; end distance uses e
-        start_idx = s
-        end_idx = e
+        if s >= e:
+            continue
 
         # Build attributes dict for all requested detail types
         attrs: Dict[str, Any] = {}
-        for dtype, dlist in (details_data or {}).items():
-            attrs[dtype] = value_for_segment(dlist, s, e)
-
-        segments.append(
-            RouteSegment(
-                start_index=start_idx,
-                end_index=end_idx,
-                start_distance=coordinate_distances[start_idx],
-                end_distance=coordinate_distances[end_idx],
-                attributes=attrs,
-            )
-        )
-
-    return segments
-
-
-def execute_route_request(
+        for dtype, rows in clamped.items():
+            # Skip intervals that end at or before this segment; they can
+            # never cover a later segment either, so the cursor only advances
+            k = cursors[dtype]
+            n_rows = len(rows)
+            while k < n_rows and rows[k][1] <= s:
+                k += 1
+            cursors[dtype] = k
+
+            if k < n_rows and rows[k][0] <= s and e <= rows[k][1]:
+                v = rows[k][2]
+                attrs[dtype] = v if v not in (None, "", "missing", "null", "undefined") else "unknown"
+            else:
+                attrs[dtype] = "unknown"
+
+        raw_segments.append({
+            "start_index": s,
+            "end_index": e,
+            "start_distance": coordinate_distances[s],
+            "end_distance": coordinate_distances[e],
+            "attributes": attrs,
+        })
+
+    return [RouteSegment.model_construct(**d) for d in raw_segments]
+
+
+def _decode_polyline(encoded: str, has_elevation: bool = False) -> np.ndarray:
+    """Decode a GraphHopper polyline into an (N, 2|3) [lon, lat(, ele)] array.
+
+    Tight loop over the encoded bytes (precision 1e5 for lat/lon, 1e2 for
+    elevation), accumulating integer deltas and scaling once in NumPy at the
+    end instead of boxing a Python float per coordinate.
+    """
+    dims = 3 if has_elevation else 2
+    values: List[int] = []
+    index = 0
+    length = len(encoded)
+    current = [0] * dims
+
+    while index < length:
+        for d in range(dims):
+            result = 0
+            shift = 0
+            while True:
+                b = ord(encoded[index]) - 63
+                index += 1
+                result |= (b & 0x1F) << shift
+                shift += 5
+                if b < 0x20:
+                    break
+            current[d] += ~(result >> 1) if result & 1 else result >> 1
+        values.extend(current)
+
+    arr = np.asarray(values, dtype=np.float64).reshape(-1, dims)
+    # GraphHopper encodes [lat, lon(, ele)]; reorder to [lon, lat(, ele)]
+    arr[:, [0, 1]] = arr[:, [1, 0]]
+    return arr * np.array([1e-5, 1e-5, 1e-2][:dims])
+
+
+async def execute_route_request(
         start: Tuple[float, float],
         end: Tuple[float, float],
         profile: str,
         custom_model: Optional[Dict[str, Any]],
         config: GraphHopperConfig,
         include_elevation: bool = True,
-        details: Optional[List[str]] = None  # List of detail types
+        details: Optional[List[str]] = None,  # List of detail types
+        encoded: bool = True
 ) -> RouteResponse:
-    """Execute route request with unencoded points and elevation."""
+    """Execute route request and decode the returned geometry.
+
+    By default the points come back as an encoded polyline (~5-6x smaller on
+    the wire than the nested JSON coordinate arrays) and are decoded by
+    _decode_polyline; pass encoded=False to fall back to unencoded GeoJSON.
+    """
     try:
-        # Create payload for GraphHopper with unencoded points and elevation
         payload = {
             "points": [[start[1], start[0]], [end[1], end[0]]],  # [lat, lon] format for GraphHopper
             "profile": profile,
-            "points_encoded": False,  # Request unencoded points
+            "points_encoded": encoded,
             "elevation": include_elevation,  # Request elevation data
             "instructions": False,
             "calc_points": True,
@@ -207,15 +353,17 @@ def execute_route_request(
         # Make request to GraphHopper
         url = f"{config.base_url.rstrip('/')}/route"
 
-        response = requests.post(
+        # orjson encodes/decodes the large coordinate payloads in C,
+        # noticeably faster than the stdlib-backed .json() helpers
+        response = await _client.post(
             url,
-            data=json.dumps(payload),
+            content=orjson.dumps(payload),
             headers={"Content-Type": "application/json"},
             timeout=config.timeout
         )
 
         if response.status_code != 200:
-            error_data = response.json() if response.headers.get('content-type') == 'application/json' else {}
+            error_data = _loads(response.content) if response.headers.get('content-type') == 'application/json' else {}
             error_msg = error_data.get("message", f"HTTP {response.status_code}")
             return RouteResponse(
                 geometry=RouteGeometry(coordinates=[]),
@@ -225,7 +373,7 @@ def execute_route_request(
                 error=error_msg
             )
 
-        data = response.json()
+        data = _loads(response.content)
 
         if not data.get("paths"):
             return RouteResponse(
@@ -241,28 +389,41 @@ def execute_route_request(
         # Extract coordinates
         points_data = path.get("points", {})
 
-        if isinstance(points_data, dict) and points_data.get("type") == "LineString":
-            # GeoJSON format with elevation: [[lon, lat, elevation], ...]
-            coordinates = points_data.get("coordinates", [])
+        if isinstance(points_data, str):
+            # Encoded polyline mode
+            coords_np = _decode_polyline(points_data, has_elevation=include_elevation)
         else:
-            # Fallback to simple array format
-            coordinates = points_data if isinstance(points_data, list) else []
-
-        # Convert coordinates to [lon, lat] format for frontend (remove elevation)
-        frontend_coordinates = [[coord[0], coord[1]] for coord in coordinates]
+            if isinstance(points_data, dict) and points_data.get("type") == "LineString":
+                # GeoJSON format with elevation: [[lon, lat, elevation], ...]
+                coordinates = points_data.get("coordinates", [])
+            else:
+                # Fallback to simple array format
+                coordinates = points_data if isinstance(points_data, list) else []
+
+            # Pack straight into a contiguous float64 buffer; fromiter with a
+            # known count skips the shape-discovery pass np.asarray would do
+            # over N small Python lists.
+            if coordinates:
+                dims = len(coordinates[0])
+                coords_np = np.fromiter(
+                    (v for pt in coordinates for v in pt),
+                    dtype=np.float64,
+                    count=len(coordinates) * dims,
+                ).reshape(-1, dims)
+            else:
+                coords_np = np.empty((0, 2))
+        frontend_coordinates = coords_np[:, :2]
 
         # NEW: Calculate cumulative distances for all coordinates
         coordinate_distances = calculate_cumulative_distances(frontend_coordinates)
-        print(f"Calculated distances for {len(coordinate_distances)} coordinates")
 
         # Create elevation profile from actual coordinate elevation data
         elevation_profile = None
-        if include_elevation and coordinates:
+        if include_elevation and len(coords_np):
             elevation_profile = create_elevation_profile_from_coordinates(
-                coordinates,
+                coords_np,
                 coordinate_distances
             )
-            print(f"Created elevation profile with {len(elevation_profile)} points from coordinate data")
 
         # Process details into segments
         segments = None
@@ -273,7 +434,16 @@ def execute_route_request(
                 details_data,
                 coordinate_distances  # NEW: Pass coordinate distances
             )
-            print(f"Processed {len(segments)} segments with details: {', '.join(details)}")
+
+        # One summary line per request instead of a print per stage; %-style
+        # args skip formatting entirely when the level is disabled
+        logger.debug(
+            "route %s: %d coords, %d elevation points, %d segments",
+            profile,
+            len(coordinate_distances),
+            len(elevation_profile) if elevation_profile else 0,
+            len(segments) if segments else 0,
+        )
 
         return RouteResponse(
             geometry=RouteGeometry(
@@ -290,7 +460,7 @@ def execute_route_request(
             success=True
         )
 
-    except requests.exceptions.RequestException as e:
+    except httpx.HTTPError as e:
         return RouteResponse(
             geometry=RouteGeometry(coordinates=[]),
             metrics=RouteMetrics(distance_meters=0, time_ms=0),
@@ -315,12 +485,11 @@ async def get_route_async(
         custom_model: Optional[Dict[str, Any]],
         config: GraphHopperConfig,
         include_elevation: bool = True,
-        details: Optional[List[str]] = None
+        details: Optional[List[str]] = None,
+        encoded: bool = True
 ) -> RouteResponse:
     """Execute route request asynchronously."""
-    loop = asyncio.get_event_loop()
-    return await loop.run_in_executor(
-        thread_pool,
-        execute_route_request,
-        start, end, profile, custom_model, config, include_elevation, details
+    return await execute_route_request(
+        start, end, profile, custom_model, config, include_elevation, details,
+        encoded
     )
\ No newline at end of file
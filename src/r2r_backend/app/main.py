@@ -1,18 +1,24 @@
 # File: main.py
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 from ..routers import routes
 
-app = FastAPI(title="GraphHopper Proxy API", version="1.0.0")
+# orjson serializes the large coordinate/elevation float arrays in C,
+# which dominates response time for long routes
+app = FastAPI(title="GraphHopper Proxy API", version="1.0.0",
+              default_response_class=ORJSONResponse)
 
-# CORS for frontend
+# CORS for frontend (dev origins). The compiled regex plus an explicit
+# method/header list keeps preflight handling to a single fullmatch instead
+# of reflecting every request header.
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://localhost:8080", "http://localhost:5173"],
+    allow_origin_regex=r"http://localhost:(3000|8080|5173)",
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET", "POST", "OPTIONS"],
+    allow_headers=["content-type", "authorization"],
 )
 
 # Include routes
@@ -1,7 +1,10 @@
 """Database connection and session management."""
 
 import os
+from typing import AsyncIterator
+
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, Session
 from dotenv import load_dotenv
 
@@ -20,14 +23,23 @@ if not all([db_user, db_password, db_host]):
         "Please check db_user, db_password, and db_host are set."
     )
 
-DATABASE_URL = f"postgresql://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+# psycopg3 driver: pipelined statements and faster binary row decoding
+DATABASE_URL = f"postgresql+psycopg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
 
-# Create engine with pooler-friendly settings
+# Create engine with pooler-friendly settings.
+# The explicit QueuePool sizing is shared by the API and the CLI scripts so
+# short-lived invocations reuse sockets instead of piling up connections
+# against Postgres's connection cap. pool_recycle replaces pre-ping, saving
+# the extra SELECT 1 round-trip on every checkout.
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
+    # Room for every hot statement's compiled SQL (default 500); compiling
+    # the Core expression tree is a real cost in per-request query loops
+    query_cache_size=1200,
     pool_size=10,
     max_overflow=20,
+    pool_timeout=30,
+    pool_recycle=1800,  # Recycle sockets before the pooler kills idle ones
     # Important for Supabase pooler
     connect_args={
         "sslmode": "require",  # Supabase requires SSL
@@ -38,10 +50,40 @@ engine = create_engine(
 # Session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Async engine for the API: the workload is I/O-bound, and asyncpg's binary
+# protocol decodes the UUID/JSONB-heavy rows several times faster than the
+# sync driver. The sync engine above stays for the CLI scripts and Alembic.
+# Relationships are declared lazy="selectin" (bounded) or lazy="raise"
+# (unbounded collections), so attribute access never triggers the implicit
+# lazy loads that break under AsyncSession.
+ASYNC_DATABASE_URL = f"postgresql+asyncpg://{db_user}:{db_password}@{db_host}:{db_port}/{db_name}"
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    query_cache_size=1200,
+    pool_size=10,
+    max_overflow=20,
+    pool_timeout=30,
+    pool_recycle=1800,
+    connect_args={
+        "ssl": True,  # Supabase requires SSL
+        "timeout": 10,
+    }
+)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
 def get_db() -> Session:
     """Dependency for FastAPI routes."""
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+async def get_async_db() -> AsyncIterator[AsyncSession]:
+    """Async session dependency for FastAPI routes."""
+    async with AsyncSessionLocal() as db:
+        yield db
\ No newline at end of file
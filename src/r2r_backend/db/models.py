@@ -6,7 +6,12 @@ Designed for Supabase with RLS support.
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
+    and_,
+    BigInteger,
+    bindparam,
     Column,
+    Computed,
+    Identity,
     Integer,
     String,
     Float,
@@ -14,16 +19,20 @@ from sqlalchemy import (
     JSON,
     ForeignKey,
     DateTime,
+    LargeBinary,
     Text,
     Enum,
     UniqueConstraint,
     CheckConstraint,
     Index,
+    insert,
+    select,
+    text,
 )
-from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship, declarative_base
+from geoalchemy2 import Geography
+from sqlalchemy.dialects.postgresql import ARRAY, UUID, JSONB
+from sqlalchemy.orm import aliased, relationship, declarative_base
 from sqlalchemy.sql import func
-import uuid
 
 Base = declarative_base()
 
@@ -46,11 +55,6 @@ class RequestStatus(str, PyEnum):
     FAILED = "failed"
 
 
-def generate_uuid():
-    """Generate a UUID4 string"""
-    return str(uuid.uuid4())
-
-
 class GraphHopperCustomProfile(Base):
     """
     Master templates for GraphHopper custom profiles.
@@ -59,7 +63,14 @@ class GraphHopperCustomProfile(Base):
     __tablename__ = "graphhopper_custom_profiles"
 
     id = Column(Integer, primary_key=True)
-    discipline = Column(Enum(DisciplineType), nullable=False)
+    # native_enum=False stores a plain VARCHAR + CHECK constraint instead of a
+    # Postgres ENUM type: no per-connection OID lookup, and adding a value is
+    # a constraint swap rather than ALTER TYPE. create_constraint must be
+    # requested explicitly (it defaults off since SQLAlchemy 1.4) or the
+    # column renders as a bare VARCHAR with no value validation at all.
+    discipline = Column(Enum(DisciplineType, native_enum=False, length=20,
+                             create_constraint=True, name='disciplinetype'),
+                        nullable=False)
     name = Column(String(255), nullable=False)
     description = Column(Text)
 
@@ -72,20 +83,27 @@ class GraphHopperCustomProfile(Base):
     # Version control
     version = Column(Integer, nullable=False, default=1)
     is_active = Column(Boolean, nullable=False, default=True)
-    template_hash = Column(String(64))  # SHA256 of template for change detection
+    # SHA256 of template for change detection: computed by pgcrypto inside
+    # Postgres (needs the pgcrypto extension), stored as raw bytes — half the
+    # width of hex and no app-side hashing on insert
+    template_hash = Column(LargeBinary(32),
+                           Computed("digest(template::text, 'sha256')", persisted=True))
 
     # Metadata
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
-    priors = relationship("ProfilePrior", back_populates="profile", cascade="all, delete-orphan")
+    priors = relationship("ProfilePrior", back_populates="profile", cascade="all, delete-orphan",
+                          lazy="selectin")
     user_profiles = relationship("UserProfile", back_populates="custom_profile")
 
     # Constraints
     __table_args__ = (
         UniqueConstraint('discipline', 'version', name='unique_discipline_version'),
-        Index('idx_active_profiles', 'discipline', 'is_active'),
+        # Partial: lookups filter is_active=true almost exclusively, so only
+        # index the live rows — smaller depth, hotter in cache
+        Index('idx_active_profiles', 'discipline', postgresql_where=text('is_active')),
     )
 
 
@@ -99,9 +117,13 @@ class ProfilePrior(Base):
     id = Column(Integer, primary_key=True)
     profile_id = Column(Integer, ForeignKey("graphhopper_custom_profiles.id"), nullable=False)
 
-    # Prior parameters as key-value pairs
-    means = Column(JSONB, nullable=False)  # {"param1": 1.5, "param2": 0.8, ...}
-    variances = Column(JSONB, nullable=False)  # {"param1": 0.01, "param2": 0.01, ...}
+    # Prior parameters as bare float arrays, ordered to match the profile's
+    # parameter name list: one C-level array decode per row instead of
+    # building a Python dict per JSONB value, and the math side can feed them
+    # straight into NumPy. Recover a dict with
+    # dict(zip(profile.parameters, prior.means)) when names are needed.
+    means = Column(ARRAY(Float), nullable=False)
+    variances = Column(ARRAY(Float), nullable=False)
 
 
     # Metadata about how these priors were learned
@@ -118,6 +140,7 @@ class ProfilePrior(Base):
 
     __table_args__ = (
         UniqueConstraint('profile_id', 'version', name='unique_profile_prior_version'),
+        Index('idx_active_priors', 'profile_id', postgresql_where=text('is_active')),
     )
 
 
@@ -128,7 +151,8 @@ class UserProfile(Base):
     """
     __tablename__ = "user_profiles"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True,
+                server_default=text("gen_random_uuid()"))
 
     # Link to Supabase auth user
     user_id = Column(UUID(as_uuid=True), nullable=False)  # From auth.users
@@ -147,11 +171,26 @@ class UserProfile(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
-    # Relationships
-    custom_profile = relationship("GraphHopperCustomProfile", back_populates="user_profiles")
+    # Relationships. lazy="selectin" batches the load for a whole list of
+    # profiles into one WHERE ... IN (...) query instead of one SELECT per row
+    # (the classic N+1) when these are touched after a multi-row fetch — but
+    # only for the small bounded relationships; the unbounded collections
+    # below are lazy="raise" so they can never be materialized by accident.
+    custom_profile = relationship("GraphHopperCustomProfile", back_populates="user_profiles",
+                                  lazy="selectin")
+    # The full versioned history is unbounded; latest_learned_parameters
+    # (below) supersedes it for reads, so loading it must be a deliberate
+    # selectinload() at the call site rather than an eager default
     learned_parameters = relationship("LearnedParameters", back_populates="user_profile",
-                                      cascade="all, delete-orphan", order_by="LearnedParameters.created_at.desc()")
-    ratings = relationship("SegmentRating", back_populates="user_profile", cascade="all, delete-orphan")
+                                      cascade="all, delete-orphan", order_by="LearnedParameters.created_at.desc()",
+                                      lazy="raise")
+    # A user's rating set runs to ~100k rows; retraining streams it via
+    # SegmentRating.iter_weights_for_profile instead of ORM instances
+    ratings = relationship("SegmentRating", back_populates="user_profile", cascade="all, delete-orphan",
+                           lazy="raise")
+
+    # latest_learned_parameters is defined below the LearnedParameters class
+    # (it joins against a window-function subquery over that table)
 
     __table_args__ = (
         UniqueConstraint('user_id', 'profile_id', name='unique_user_profile'),
@@ -166,11 +205,13 @@ class LearnedParameters(Base):
     """
     __tablename__ = "learned_parameters"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True,
+                server_default=text("gen_random_uuid()"))
     user_profile_id = Column(UUID(as_uuid=True), ForeignKey("user_profiles.id"), nullable=False)
 
-    # The actual parameters
-    parameters = Column(JSONB, nullable=False)  # {"param1": 1.2, "param2": 0.9, ...}
+    # The actual parameters, ordered like the profile's parameter name list
+    # (see ProfilePrior.means for the rationale)
+    parameters = Column(ARRAY(Float), nullable=False)
 
     # Track if this is the initial prior or learned from ratings
     is_prior = Column(Boolean, nullable=False, default=False)
@@ -182,7 +223,11 @@ class LearnedParameters(Base):
     # Computation details
     computation_time_ms = Column(Integer)
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # clock_timestamp() (not transaction-start now()) so bulk-inserted rows
+    # get distinct timestamps — created_at ordering and the
+    # idx_learned_params_created range scans stay meaningful under batch loads
+    created_at = Column(DateTime(timezone=True), server_default=text('clock_timestamp()'),
+                        nullable=False)
 
     # Relationships
     user_profile = relationship("UserProfile", back_populates="learned_parameters")
@@ -193,6 +238,27 @@ class LearnedParameters(Base):
     )
 
 
+class ParametersCache(Base):
+    """
+    Cache of Bayesian-optimization results keyed by the exact rating set.
+    Two user profiles with identical ratings (seeded demo users, shared
+    fleets) reuse the same optimization instead of re-running it.
+    """
+    __tablename__ = "parameters_cache"
+
+    profile_id = Column(Integer, ForeignKey("graphhopper_custom_profiles.id"),
+                        primary_key=True)
+    # SHA256 over the sorted (osm_way_id, weight) pairs; the worker computes
+    # it with pgcrypto's digest over an aggregate so hashing stays in the DB
+    ratings_hash = Column(LargeBinary(32), primary_key=True)
+
+    # Cached optimization result, ordered like the profile's parameter list
+    # (same convention as LearnedParameters.parameters)
+    parameters = Column(ARRAY(Float), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class OSMWay(Base):
     """
     Sparse table of OSM ways that have been rated.
@@ -203,8 +269,10 @@ class OSMWay(Base):
     id = Column(Integer, primary_key=True)
     osm_id = Column(String(50), nullable=False, unique=True)  # OSM way ID as string
 
-    # Geometry (stored as WKT for simplicity in MVP)
-    geometry_wkt = Column(Text, nullable=False)
+    # Geometry as a native PostGIS linestring: parsed once at ingest, read as
+    # binary WKB afterwards instead of reparsing ASCII WKT per row. Way shapes
+    # aren't queried spatially (lookups go through osm_id), so no GiST index.
+    geometry = Column(Geography('LINESTRING', srid=4326, spatial_index=False), nullable=False)
 
     # Key attributes for display/context
     surface = Column(String(50))
@@ -212,19 +280,20 @@ class OSMWay(Base):
     highway_class = Column(String(50))  # residential, primary, track, etc.
     track_type = Column(String(10))  # grade1-grade5 for tracks
 
-    # Cached statistics
-    length_meters = Column(Float)
+    # Cached statistics. Length is generated from the geography (ST_Length
+    # yields meters directly) so it can never drift and ingest skips the
+    # Python-side computation; elevation gain stays stored — the 2D geometry
+    # can't derive it.
+    length_meters = Column(Float, Computed("ST_Length(geometry)", persisted=True))
     elevation_gain = Column(Float)
 
     # When this way was first added
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
-    # Relationships
-    ratings = relationship("SegmentRating", back_populates="osm_way", cascade="all, delete-orphan")
-
-    __table_args__ = (
-        Index('idx_osm_way_id', 'osm_id'),
-    )
+    # Relationships. Unbounded collection — never loaded implicitly; query
+    # SegmentRating directly when a way's ratings are actually needed
+    ratings = relationship("SegmentRating", back_populates="osm_way", cascade="all, delete-orphan",
+                           lazy="raise")
 
 
 class SegmentRating(Base):
@@ -234,8 +303,13 @@ class SegmentRating(Base):
     """
     __tablename__ = "segment_ratings"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_profile_id = Column(UUID(as_uuid=True), ForeignKey("user_profiles.id"), nullable=False)
+    # Ratings are high-volume append-only: a bigint identity PK appends at
+    # the rightmost btree page instead of splitting leaves all over a random-
+    # UUID index, and halves the PK (and FK index) width. user_profile_id is
+    # part of the PK because it's the hash-partitioning key below.
+    id = Column(BigInteger, Identity(), primary_key=True)
+    user_profile_id = Column(UUID(as_uuid=True), ForeignKey("user_profiles.id"),
+                             primary_key=True, nullable=False)
     osm_way_id = Column(Integer, ForeignKey("osm_ways.id"), nullable=False)
 
     # The rating as a weight/multiplier (0.1 to 10, where 1.0 is reference)
@@ -245,19 +319,58 @@ class SegmentRating(Base):
     notes = Column(Text)  # User's notes about this rating
     conditions = Column(JSONB)  # {"weather": "dry", "time_of_day": "morning", ...}
 
-    # Timestamps
-    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    # Timestamps (clock_timestamp so batch-ingested ratings order correctly)
+    created_at = Column(DateTime(timezone=True), server_default=text('clock_timestamp()'),
+                        nullable=False)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
 
     # Relationships
     user_profile = relationship("UserProfile", back_populates="ratings")
     osm_way = relationship("OSMWay", back_populates="ratings")
 
+    # Rows per multi-values INSERT statement in bulk_insert
+    BULK_INSERT_CHUNK = 1000
+
+    @classmethod
+    def bulk_insert(cls, session, rows) -> int:
+        """Insert rating row mappings via multi-row INSERT statements.
+
+        Skips the ORM unit of work — no per-row INSERT and no RETURNING,
+        since the identity PK and timestamp defaults are filled server-side.
+        Rows are rendered as multi-VALUES statements of up to
+        BULK_INSERT_CHUNK rows each; returns the number of rows inserted.
+        """
+        for start in range(0, len(rows), cls.BULK_INSERT_CHUNK):
+            session.execute(insert(cls).values(rows[start:start + cls.BULK_INSERT_CHUNK]))
+        return len(rows)
+
+    @classmethod
+    def iter_weights_for_profile(cls, session, user_profile_id, batch_size: int = 5000):
+        """Stream (osm_way_id, weight) pairs for one user profile.
+
+        Column select + yield_per instead of ORM instances: no __dict__ or
+        InstanceState per row, so retraining over 100k ratings iterates
+        lightweight tuples (feed them straight into np.fromiter) at a small
+        constant memory footprint. Index-only via idx_ratings_user_profile.
+        """
+        return session.execute(
+            select(cls.osm_way_id, cls.weight)
+            .where(cls.user_profile_id == user_profile_id)
+            .execution_options(yield_per=batch_size)
+        )
+
     __table_args__ = (
         UniqueConstraint('user_profile_id', 'osm_way_id', name='unique_user_way_rating'),
         CheckConstraint('weight > 0 AND weight <= 100', name='valid_weight_range'),
-        Index('idx_ratings_user_profile', 'user_profile_id'),
+        # INCLUDE makes the retraining read (osm_way_id, weight per user) an
+        # index-only scan with no heap fetches
+        Index('idx_ratings_user_profile', 'user_profile_id',
+              postgresql_include=['osm_way_id', 'weight']),
         Index('idx_ratings_way', 'osm_way_id'),
+        # Hash-partitioned on the retraining access path: reading one user's
+        # ratings touches exactly one partition, and each partition's indexes
+        # are a fraction of the monolithic btree depth
+        {'postgresql_partition_by': 'HASH (user_profile_id)'},
     )
 
 
@@ -268,11 +381,14 @@ class ParameterUpdateRequest(Base):
     """
     __tablename__ = "parameter_update_requests"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True,
+                server_default=text("gen_random_uuid()"))
     user_profile_id = Column(UUID(as_uuid=True), ForeignKey("user_profiles.id"), nullable=False)
 
     # Request status
-    status = Column(Enum(RequestStatus), nullable=False, default=RequestStatus.PENDING)
+    status = Column(Enum(RequestStatus, native_enum=False, length=20,
+                         create_constraint=True, name='requeststatus'),
+                    nullable=False, default=RequestStatus.PENDING)
 
     # Processing details
     requested_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -286,8 +402,29 @@ class ParameterUpdateRequest(Base):
     # Result reference
     learned_parameters_id = Column(UUID(as_uuid=True))  # ID of created learned_parameters entry
 
+    @classmethod
+    def claim_next(cls, session):
+        """Claim the oldest pending request for this worker, or None.
+
+        FOR UPDATE SKIP LOCKED lets concurrent workers each grab a different
+        row without racing or retry loops; together with the partial queue
+        index the scan only touches live entries. The caller owns the
+        transaction and should set status to PROCESSING before committing.
+        """
+        return session.execute(
+            select(cls)
+            .where(cls.status == RequestStatus.PENDING)
+            .order_by(cls.requested_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar_one_or_none()
+
     __table_args__ = (
-        Index('idx_update_requests_status', 'status'),
+        # Queue polling scans status IN ('pending','processing') ORDER BY
+        # requested_at; the partial index only holds live queue entries, not
+        # the ever-growing completed/failed history
+        Index('idx_update_requests_queue', 'requested_at',
+              postgresql_where=text("status IN ('PENDING', 'PROCESSING')")),
         Index('idx_update_requests_user', 'user_profile_id'),
     )
 
@@ -298,16 +435,19 @@ class SavedRoute(Base):
     """
     __tablename__ = "saved_routes"
 
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True,
+                server_default=text("gen_random_uuid()"))
     user_id = Column(UUID(as_uuid=True), nullable=False)  # From auth.users
 
     name = Column(String(255), nullable=False)
     description = Column(Text)
 
-    # Route data
-    geometry_wkt = Column(Text, nullable=False)  # LINESTRING WKT
-    start_point = Column(JSONB, nullable=False)  # {"lat": 52.52, "lon": 13.405}
-    end_point = Column(JSONB, nullable=False)
+    # Route data. Endpoints are PostGIS geography points: two floats decoded
+    # in C instead of a JSONB dict per read, and spatial operators work on
+    # them directly. Not queried spatially, so no per-column GiST index.
+    geometry = Column(Geography('LINESTRING', srid=4326, spatial_index=False), nullable=False)
+    start_point = Column(Geography('POINT', srid=4326, spatial_index=False), nullable=False)
+    end_point = Column(Geography('POINT', srid=4326, spatial_index=False), nullable=False)
 
     # Route metadata
     distance_meters = Column(Float, nullable=False)
@@ -315,7 +455,8 @@ class SavedRoute(Base):
     estimated_time_seconds = Column(Integer)
 
     # Which profile was used
-    discipline = Column(Enum(DisciplineType))
+    discipline = Column(Enum(DisciplineType, native_enum=False, length=20,
+                             create_constraint=True, name='disciplinetype'))
     profile_settings = Column(JSONB)  # Snapshot of settings used
 
     # Timestamps
@@ -338,16 +479,19 @@ class PrecomputedRoute(Base):
 
     name = Column(String(255), nullable=False)
     description = Column(Text)
-    discipline = Column(Enum(DisciplineType), nullable=False)
+    discipline = Column(Enum(DisciplineType, native_enum=False, length=20,
+                             create_constraint=True, name='disciplinetype'),
+                        nullable=False)
 
     # Route data
-    geometry_wkt = Column(Text, nullable=False)
-    start_point = Column(JSONB, nullable=False)  # {"lat": 52.52, "lon": 13.405}
-    end_point = Column(JSONB, nullable=False)
+    geometry = Column(Geography('LINESTRING', srid=4326, spatial_index=False), nullable=False)
+    start_point = Column(Geography('POINT', srid=4326, spatial_index=False), nullable=False)
+    end_point = Column(Geography('POINT', srid=4326, spatial_index=False), nullable=False)
 
-    # Location for spatial queries (could add PostGIS later)
-    center_lat = Column(Float, nullable=False)
-    center_lon = Column(Float, nullable=False)
+    # Location for spatial queries: a geography point under a GiST index
+    # supports true KNN (ORDER BY center_point <-> :loc LIMIT n) instead of
+    # the range scans the old (center_lat, center_lon) btree allowed
+    center_point = Column(Geography('POINT', srid=4326, spatial_index=False), nullable=False)
 
     # Route characteristics
     distance_meters = Column(Float, nullable=False)
@@ -360,6 +504,56 @@ class PrecomputedRoute(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     __table_args__ = (
-        Index('idx_precomputed_location', 'center_lat', 'center_lon'),
+        Index('idx_precomputed_center', 'center_point', postgresql_using='gist'),
         Index('idx_precomputed_discipline', 'discipline'),
-    )
\ No newline at end of file
+    )
+
+# Most call sites only need the newest parameter set. Joining against a
+# row_number() window subquery makes the database return exactly one row per
+# profile, instead of shipping (and discarding) the whole versioned history
+# that a plain order_by + uselist=False relationship would load. Defined at
+# module bottom: building the subquery configures the mappers, so every
+# class's string relationship targets must already exist.
+_lp_ranked = select(
+    LearnedParameters,
+    func.row_number()
+    .over(
+        partition_by=LearnedParameters.user_profile_id,
+        order_by=LearnedParameters.created_at.desc(),
+    )
+    .label("recency_rank"),
+).subquery()
+
+_LatestLearnedParameters = aliased(LearnedParameters, _lp_ranked)
+
+UserProfile.latest_learned_parameters = relationship(
+    _LatestLearnedParameters,
+    primaryjoin=and_(
+        UserProfile.id == _lp_ranked.c.user_profile_id,
+        _lp_ranked.c.recency_rank == 1,
+    ),
+    uselist=False,
+    viewonly=True,
+    lazy="selectin",
+)
+
+# Precompiled hot-path lookups: the Core expression tree is built once at
+# import; callers bind parameters per execution, so each statement is
+# compiled to SQL a single time and served from the engine's compiled cache
+# afterwards.
+GET_ACTIVE_PRIOR_STMT = (
+    select(ProfilePrior)
+    .where(
+        ProfilePrior.profile_id == bindparam('profile_id'),
+        ProfilePrior.is_active.is_(True),
+    )
+    .order_by(ProfilePrior.version.desc())
+    .limit(1)
+)
+
+GET_LATEST_LEARNED_PARAMS_STMT = (
+    select(LearnedParameters)
+    .where(LearnedParameters.user_profile_id == bindparam('user_profile_id'))
+    .order_by(LearnedParameters.created_at.desc())
+    .limit(1)
+)
@@ -1,5 +1,6 @@
 from fastapi import APIRouter, HTTPException, Depends
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 
 from models import RouteRequest, RouteResponse
 from ..app.dependencies import get_graphhopper_config
@@ -8,6 +9,13 @@ from r2r_bo.graphhopper.config import GraphHopperConfig
 
 router = APIRouter()
 
+# Default detail types, hoisted out of the per-request path (immutable/shared)
+_DEFAULT_DETAILS: tuple[str, ...] = ('surface', 'smoothness')
+
+# Dedicated pool for custom-model generation so it doesn't contend with
+# unrelated blocking work on the loop's default executor
+_CUSTOM_MODEL_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="custom-model")
+
 
 @router.post("/route", response_model=RouteResponse)
 async def get_route(
@@ -20,15 +28,15 @@ async def get_route(
     profile = request.profile or config.default_profile
 
     # Use default details if none provided
-    details = request.details or ['surface', 'smoothness']  # Default details
+    details = request.details or _DEFAULT_DETAILS
 
     # Generate custom model if needed
     custom_model = None
     if request.custom_profile_id and request.parameters:
         try:
-            loop = asyncio.get_event_loop()
+            loop = asyncio.get_running_loop()
             custom_model = await loop.run_in_executor(
-                None, get_custom_model, request.custom_profile_id, request.parameters
+                _CUSTOM_MODEL_EXECUTOR, get_custom_model, request.custom_profile_id, request.parameters
             )
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Custom profile error: {str(e)}")